@@ -12,6 +12,11 @@ const idArray = [
     "60704", "60701", "60736", "60745", "60751", "60767", "60775", "60797", "60800", "60809"
 ];
 
+// Grid load detection settings (adjust as needed)
+const GRID_SETTLE_MS = 300;     // Grid must stay unchanged this long before it is read
+const GRID_TIMEOUT_MS = 15000;  // Give up waiting for one attempt after this long
+const GRID_MAX_RETRIES = 2;     // Re-enter the ID this many times after a timeout
+
 // Step 2: Function to enter ID into the input field
 function enterId(id) {
     const inputElement = document.getElementById("wfStatusGrid_DXSE_I");
@@ -83,18 +88,85 @@ function getAnnualLeaveAsCSV() {
     return csv;
 }
 
-// Step 4: Main function to loop through IDs and process
+// Step 4: Check that the grid currently shows the results for an ID
+// (an empty grid only counts once it has refreshed, see waitForGrid)
+function gridShowsId(id, allowEmpty) {
+    const table = document.getElementById("wfStatusGrid_DXMainTable");
+    if (!table) return false;
+
+    const dataRows = table.querySelectorAll("tr[id^='wfStatusGrid_DXDataRow']");
+    if (dataRows.length === 0) {
+        // No leave at all for this ID: the grid shows its "no data" row instead
+        return allowEmpty && table.querySelector("tr[id^='wfStatusGrid_DXEmptyRow']") !== null;
+    }
+
+    // Every data row must belong to the entered ID (Employee Code is the 5th cell, index 4)
+    return Array.from(dataRows).every(row => {
+        const cells = row.querySelectorAll("td");
+        return cells.length > 4 && cells[4].innerText.trim() === id;
+    });
+}
+
+// Step 5: Wait until the grid has refreshed for an ID and stopped changing
+function waitForGrid(id, timeoutMs) {
+    return new Promise(resolve => {
+        // Watch the grid's container, as the table itself may be replaced on refresh
+        const table = document.getElementById("wfStatusGrid_DXMainTable");
+        const target = (table && table.parentElement) || document.body;
+
+        let settleTimer = null;
+        let timeoutTimer = null;
+        let observer = null;
+        let refreshed = false;
+
+        const finish = loaded => {
+            clearTimeout(settleTimer);
+            clearTimeout(timeoutTimer);
+            observer.disconnect();
+            resolve(loaded);
+        };
+
+        // (Re)start the quiet period; when it ends, accept the grid if it shows the ID
+        const scheduleCheck = () => {
+            clearTimeout(settleTimer);
+            settleTimer = setTimeout(() => {
+                if (gridShowsId(id, refreshed)) finish(true);
+            }, GRID_SETTLE_MS);
+        };
+
+        observer = new MutationObserver(() => {
+            refreshed = true;
+            scheduleCheck();
+        });
+        observer.observe(target, { childList: true, subtree: true, characterData: true });
+        timeoutTimer = setTimeout(() => finish(false), timeoutMs);
+
+        // The grid may already show this ID (e.g. the same ID twice in a row)
+        scheduleCheck();
+    });
+}
+
+// Step 6: Main function to loop through IDs and process
 async function runAutomation() {
     for (let i = 0; i < idArray.length; i++) {
         const id = idArray[i];
 
         console.log(`Processing ID #${i + 1}: ${id}`);
 
-        // Enter ID into the input box
-        enterId(id);
+        // Enter ID into the input box and wait for the grid to show its rows,
+        // re-entering the ID if the grid does not refresh in time
+        let loaded = false;
+        for (let attempt = 0; attempt <= GRID_MAX_RETRIES && !loaded; attempt++) {
+            if (attempt > 0) console.warn(`Grid did not refresh for ID: ${id}, retrying (${attempt}/${GRID_MAX_RETRIES})`);
+            enterId(id);
+            loaded = await waitForGrid(id, GRID_TIMEOUT_MS);
+        }
 
-        // Wait for table to load (adjust timeout as needed)
-        await new Promise(resolve => setTimeout(resolve, 3000)); // 3 seconds
+        if (!loaded) {
+            // Do not capture stale rows from the previous ID
+            console.error(`Timed out waiting for grid data for ID: ${id}, skipping.`);
+            continue;
+        }
 
         // Get Annual Leave data as CSV
         const csv = getAnnualLeaveAsCSV();
@@ -104,9 +176,6 @@ async function runAutomation() {
         } else {
             console.warn(`No Annual Leave data found for ID: ${id}`);
         }
-
-        // Pause before processing the next ID
-        await new Promise(resolve => setTimeout(resolve, 2000)); // 2 seconds
     }
 
     console.log("✅ Automation complete!");
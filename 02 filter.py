@@ -1,45 +1,218 @@
+import argparse
 import csv
+import os
+import shutil
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
-# Step 1: Read employee codes from employee.csv
-employee_codes = set()
-
-with open('employee.csv', mode='r', encoding='utf-8') as emp_file:
-    reader = csv.reader(emp_file)
-    for row in reader:
-        if len(row) >= 3:
-            code = row[2].strip().strip('"')  # Third column is Employee Code
-            if code.isdigit() or code.startswith(("60", "12")):
-                employee_codes.add(code)
-
-print(f"Loaded {len(employee_codes)} employee codes.")
-
-# Step 2: Read output.csv and filter raw lines
-input_file = 'output.csv'
-output_file = 'filtered_output.csv'
+import leave_state
+from harvest_parser import last_block_id, parse_lines, unique_records
+from metrics import add_metrics_arguments, metrics_from_args, optional_phase
+from roster import load_employee_codes
 
 # Define header manually since the file is messy
 header = ['PID', 'Submission Date', 'Workflow Type', 'Employee Code', 'Employee_Name',
           'Start Date', 'End Date', 'Period', 'Sent To Payroll', 'Status']
 
-valid_rows = []
+# Read output.csv in large buffered chunks so multi-GB exports stream through
+READ_BUFFER_SIZE = 1024 * 1024
+
+
+def filter_lines(lines, employee_codes, rejected=None, block_id=None):
+    """
+    Yields the LeaveRecord of every row in a '01 vac.js' console dump whose
+    Employee Code is in employee_codes, dropping repeated PIDs and rows whose
+    Employee Code is not the ID of their block (stale rows of the previous ID).
+
+    If a Counter is passed as `rejected`, dropped rows are counted in it by
+    reason. `block_id` is the block in effect before the first line (see
+    parse_lines).
+    """
+    def in_roster():
+        for record_block_id, record in parse_lines(lines, rejected=rejected, block_id=block_id):
+            if record.employee_code not in employee_codes:
+                reason = 'not in roster'
+            elif record_block_id is not None and record.employee_code != record_block_id:
+                reason = 'other block ID'
+            else:
+                yield record
+                continue
+
+            if rejected is not None:
+                rejected[reason] += 1
+
+    return unique_records(in_roster(), rejected)
+
+
+def filter_file(input_file, output_file, employee_codes, rejected=None):
+    """Streams input_file through filter_lines into output_file. Returns the row count."""
+    matched = 0
+
+    with open(input_file, mode='r', encoding='utf-8', errors='ignore', buffering=READ_BUFFER_SIZE) as infile, \
+         open(output_file, mode='w', newline='', encoding='utf-8') as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(header)
+        for record in filter_lines(infile, employee_codes, rejected):
+            writer.writerow(record)
+            matched += 1
+
+    return matched
+
+
+def split_byte_ranges(input_file, workers):
+    """Splits input_file into up to `workers` (start, end) byte ranges that begin on line boundaries."""
+    size = os.path.getsize(input_file)
+    boundaries = [0]
+
+    with open(input_file, mode='rb') as infile:
+        for i in range(1, workers):
+            position = size * i // workers
+            if position <= boundaries[-1]:
+                continue
+            infile.seek(position)
+            infile.readline()  # Move to the start of the next line
+            position = infile.tell()
+            if position >= size:
+                break
+            if position > boundaries[-1]:
+                boundaries.append(position)
+
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def iter_range_lines(infile, start, end):
+    """Yields the decoded lines that start inside [start, end) of a binary file."""
+    infile.seek(start)
+    position = start
+    while position < end:
+        raw = infile.readline()
+        if not raw:
+            break
+        position += len(raw)
+        yield raw.decode('utf-8', errors='ignore')
+
+
+def filter_range(input_file, start, end, employee_codes, part_file):
+    """
+    Worker: filters one byte range of input_file into part_file. Returns the
+    PIDs written, in order (they are only unique within the range), and a
+    Counter of rejected rows by reason.
+    """
+    pids = []
+    rejected = Counter()
+
+    with open(input_file, mode='rb', buffering=READ_BUFFER_SIZE) as infile, \
+         open(part_file, mode='w', newline='', encoding='utf-8') as outfile:
+        writer = csv.writer(outfile)
+        # A range may start inside a block; its rows belong to the last header before it
+        block_id = last_block_id(infile, start)
+        for record in filter_lines(iter_range_lines(infile, start, end), employee_codes, rejected, block_id):
+            writer.writerow(record)
+            pids.append(record.pid)
+
+    return pids, rejected
+
+
+def filter_file_parallel(input_file, output_file, employee_codes, workers, rejected=None):
+    """
+    Filters input_file with a pool of worker processes, one byte range each,
+    and merges their results into output_file in the original line order,
+    dropping PIDs already written by an earlier range. Returns the row count.
+    """
+    ranges = split_byte_ranges(input_file, workers)
+    output_dir = os.path.dirname(os.path.abspath(output_file))
+    part_files = []
+
+    try:
+        for _ in ranges:
+            fd, part_file = tempfile.mkstemp(prefix='filtered_part_', suffix='.csv', dir=output_dir)
+            os.close(fd)
+            part_files.append(part_file)
+
+        with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+            futures = [
+                pool.submit(filter_range, input_file, start, end, employee_codes, part_file)
+                for (start, end), part_file in zip(ranges, part_files)
+            ]
+            part_pids = []
+            for future in futures:
+                pids, range_rejected = future.result()
+                part_pids.append(pids)
+                if rejected is not None:
+                    rejected.update(range_rejected)
+
+        # Merge the per-range results in order. A part whose PIDs are all new is
+        # copied as raw bytes; only a part repeating an earlier range's PID is re-parsed.
+        matched = 0
+        seen_pids = set()
+        with open(output_file, mode='w', newline='', encoding='utf-8') as outfile:
+            writer = csv.writer(outfile)
+            writer.writerow(header)
+            for part_file, pids in zip(part_files, part_pids):
+                if seen_pids.isdisjoint(pids):
+                    outfile.flush()
+                    with open(part_file, mode='rb') as part:
+                        shutil.copyfileobj(part, outfile.buffer, READ_BUFFER_SIZE)
+                    seen_pids.update(pids)
+                    matched += len(pids)
+                    continue
+
+                with open(part_file, mode='r', newline='', encoding='utf-8') as part:
+                    for row in csv.reader(part):
+                        if row[0] in seen_pids:
+                            if rejected is not None:
+                                rejected['duplicate PID'] += 1
+                            continue
+                        seen_pids.add(row[0])
+                        writer.writerow(row)
+                        matched += 1
+    finally:
+        for part_file in part_files:
+            if os.path.exists(part_file):
+                os.remove(part_file)
+
+    return matched
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Filter output.csv down to rows for employees in employee.csv.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of worker processes; 0 uses every CPU core (default: 1)")
+    parser.add_argument('--state', action='store_true',
+                        help=f"upsert the filtered records into {leave_state.STATE_DB} for incremental runs")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    metrics = metrics_from_args('02 filter', args, profile_phase='filter')
+    rejected = metrics.rejected if metrics else None
+
+    # Step 1: Read employee codes from employee.csv
+    with optional_phase(metrics, 'load'):
+        employee_codes = load_employee_codes('employee.csv')
+    print(f"Loaded {len(employee_codes)} employee codes.")
+
+    # Step 2: Read output.csv and filter raw lines, writing matches as we go
+    input_file = 'output.csv'
+    output_file = 'filtered_output.csv'
 
-with open(input_file, mode='r', encoding='utf-8', errors='ignore') as infile:
-    for line in infile:
-        line = line.strip()
-        if not line:
-            continue
+    with optional_phase(metrics, 'filter'):
+        if workers > 1:
+            print(f"Filtering with {workers} worker processes...")
+            matched = filter_file_parallel(input_file, output_file, employee_codes, workers, rejected)
+        else:
+            matched = filter_file(input_file, output_file, employee_codes, rejected)
 
-        # Try to find lines starting with numeric PID and containing at least one employee code
-        if any(code in line for code in employee_codes):
-            parts = [field.strip('"') for field in line.split('","')]
-            if len(parts) >= 10 and parts[3].strip('"') in employee_codes:
-                valid_rows.append(parts)
+    print(f"\n✅ Filtering complete. Matching records: {matched}")
+    print(f"Filtered output saved to '{output_file}'")
 
-# Write filtered data to new CSV
-with open(output_file, mode='w', newline='', encoding='utf-8') as outfile:
-    writer = csv.writer(outfile)
-    writer.writerow(header)
-    writer.writerows(valid_rows)
+    if args.state:
+        with optional_phase(metrics, 'state'):
+            changed, removed = leave_state.sync_stage_file('filtered', output_file)
+        print(f"State store updated: {changed} new or changed, {removed} removed records.")
 
-print(f"\n✅ Filtering complete. Matching records: {len(valid_rows)}")
-print(f"Filtered output saved to '{output_file}'")
\ No newline at end of file
+    if metrics:
+        metrics.rows_out = matched
+        metrics.rows_in = matched + sum(metrics.rejected.values())
+        metrics.write()
@@ -1,45 +1,171 @@
+import argparse
+import contextlib
 import csv
+import re
 from datetime import datetime
+from functools import lru_cache
+
+import leave_state
+from metrics import add_metrics_arguments, metrics_from_args, optional_phase
 
 # Define input and output files
 input_file = 'filtered_output.csv'
 output_file = 'approved_2025_output.csv'
 
-# Get current year for filtering
-current_year = datetime.now().year  # Should be 2025 as of now
 
-# Read header manually to avoid issues
-header = None
-rows_to_keep = []
+@lru_cache(maxsize=None)
+def start_year(start_date):
+    """
+    Returns the year of a Start Date like '31/05/2025' (a trailing time is
+    ignored), or None if it is not a valid date.
+
+    Exports repeat the same few hundred dates, so results are memoized and
+    each distinct string is parsed only once.
+    """
+    try:
+        return datetime.strptime(start_date.split(" ")[0], "%d/%m/%Y").year
+    except ValueError:
+        return None
+
+
+def partition_file(year, status, taken=()):
+    """
+    Returns the output file for one (year, status) partition, e.g. 'pending_2025.csv'.
+
+    The status is reduced to [a-z0-9_] so that text like 'Returned/Cancelled'
+    cannot name a path outside the working directory; if two statuses reduce
+    to the same name, a number is added to the one that is not in `taken` yet.
+    The approved partition of the requested year goes to `output_file` instead,
+    which later stages read; this name never clashes with it.
+    """
+    name = re.sub(r'[^a-z0-9]+', '_', status.strip().lower()).strip('_') or 'status'
+    path = f"{name}_{year}.csv"
+    number = 2
+    while path in taken:
+        path = f"{name}_{number}_{year}.csv"
+        number += 1
+    return path
+
 
-with open(input_file, mode='r', encoding='utf-8') as infile:
-    reader = csv.reader(infile)
-    for row in reader:
-        if not header:
-            header = row
-            continue  # Skip header
+def route_rows(rows, years=None, statuses=None, rejected=None):
+    """
+    Yields ((year, status), row) for every row (without header), keyed by the
+    year of its Start Date and its Status.
 
-        # Extract relevant fields
+    Args:
+        rows (iterable): Rows in filtered_output.csv column order.
+        years (set, optional): Years to keep; None keeps every year.
+        statuses (set, optional): Statuses to keep; None keeps every status.
+        rejected (Counter, optional): Dropped rows are counted in it by reason.
+    """
+    for row in rows:
         status = row[9].strip()  # "Status" is column index 9
         start_date = row[5].strip()  # "Start Date" is column index 5
 
-        try:
-            # Try parsing date in format like '31/05/2025' or '2025-05-31'
-            start_year = int(start_date.split("/")[-1].split(" ")[0])
-        except:
+        year = start_year(start_date)
+        if year is None:
             print(f"Skipping invalid date format: {start_date}")
+            if rejected is not None:
+                rejected['invalid date'] += 1
             continue
 
-        # Apply filters
-        if status == "Approved" and start_year == current_year:
-            rows_to_keep.append(row)
+        if statuses is not None and status not in statuses:
+            if rejected is not None:
+                rejected['other status'] += 1
+        elif years is not None and year not in years:
+            if rejected is not None:
+                rejected['other year'] += 1
+        else:
+            yield (year, status), row
+
+
+def partition_rows(rows, years=None, statuses=None, rejected=None):
+    """
+    Splits rows into in-memory partitions in one pass.
+
+    Returns:
+        dict: (year, status) -> list of rows, in input order.
+    """
+    partitions = {}
+    for key, row in route_rows(rows, years, statuses, rejected):
+        partitions.setdefault(key, []).append(row)
+    return partitions
+
+
+def approved_rows(rows, year, rejected=None):
+    """
+    Yields the "Approved" rows (without header) whose Start Date falls in `year`.
+
+    If a Counter is passed as `rejected`, dropped rows are counted in it by reason.
+    """
+    for _, row in route_rows(rows, {year}, {"Approved"}, rejected):
+        yield row
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split filtered_output.csv by year and status in one pass "
+                                                 "(default: approved records of the current year).")
+    parser.add_argument('--year', type=int, action='append', dest='years',
+                        help="year to keep (repeatable; default: current year)")
+    parser.add_argument('--status', action='append', dest='statuses',
+                        help="status to keep, e.g. Approved or Pending (repeatable; default: Approved)")
+    parser.add_argument('--all', action='store_true',
+                        help="write every (year, status) partition found instead of the selected ones")
+    parser.add_argument('--state', action='store_true',
+                        help=f"upsert the approved records into {leave_state.STATE_DB} for '06 analyze.py --state'")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    metrics = metrics_from_args('04 approved', args, profile_phase='filter')
+
+    # Get current year for filtering
+    current_year = datetime.now().year  # Should be 2025 as of now
+    years = None if args.all else set(args.years or [current_year])
+    statuses = None if args.all else set(args.statuses or ["Approved"])
+
+    # The approved records of the first requested year keep the file name later stages read
+    primary_year = args.years[0] if args.years else current_year
+
+    counts = {}
+    with open(input_file, mode='r', encoding='utf-8') as infile, contextlib.ExitStack() as outputs:
+        reader = csv.reader(infile)
+
+        # Read header manually to avoid issues
+        header = next(reader, None)
+
+        writers = {}
+        paths = {}
+        with optional_phase(metrics, 'filter'):
+            for key, row in route_rows(reader, years, statuses, metrics.rejected if metrics else None):
+                writer = writers.get(key)
+                if writer is None:
+                    # Open each partition's file the first time one of its rows shows up
+                    paths[key] = output_file if key == (primary_year, "Approved") else partition_file(*key, taken=set(paths.values()))
+                    outfile = outputs.enter_context(open(paths[key], mode='w', newline='', encoding='utf-8'))
+                    writer = writers[key] = csv.writer(outfile)
+                    writer.writerow(header)  # Write header
+                    counts[key] = 0
+                writer.writerow(row)  # Write filtered rows
+                counts[key] += 1
+
+    # Later stages expect the approved file even when no row matched
+    if (years is None or primary_year in years) and (statuses is None or "Approved" in statuses) \
+            and (primary_year, "Approved") not in counts:
+        with open(output_file, mode='w', newline='', encoding='utf-8') as outfile:
+            csv.writer(outfile).writerow(header)
+        counts[(primary_year, "Approved")] = 0
+        paths[(primary_year, "Approved")] = output_file
+
+    kept = sum(counts.values())
+    print(f"\n✅ Filtering complete.")
+    for (year, status), count in sorted(counts.items()):
+        print(f"- Total {status.lower()} records for {year}: {count} (saved to '{paths[(year, status)]}')")
 
-# Write filtered data to new CSV
-with open(output_file, mode='w', newline='', encoding='utf-8') as outfile:
-    writer = csv.writer(outfile)
-    writer.writerow(header)  # Write header
-    writer.writerows(rows_to_keep)  # Write filtered rows
+    if args.state:
+        with optional_phase(metrics, 'state'):
+            changed, removed = leave_state.sync_stage_file('approved', output_file)
+        print(f"- State store updated: {changed} new or changed, {removed} removed records.")
 
-print(f"\n✅ Filtering complete.")
-print(f"- Total approved records for {current_year}: {len(rows_to_keep)}")
-print(f"- Filtered output saved to '{output_file}'")
\ No newline at end of file
+    if metrics:
+        metrics.rows_out = kept
+        metrics.rows_in = kept + sum(metrics.rejected.values())
+        metrics.write()
@@ -1,133 +1,224 @@
+import argparse
 import csv
-from datetime import datetime
+import itertools
+import os
+import sys
+from datetime import datetime, timedelta
+
+import leave_state
+from leave_columns import LeaveColumns, day_text
+from metrics import add_metrics_arguments, metrics_from_args, optional_phase
+from roster import load_employee_codes
 
 # Define date range to check
 start_check = datetime.strptime("14/06/2025", "%d/%m/%Y")
 end_check = datetime.strptime("20/06/2025", "%d/%m/%Y")
 
-# Load employee codes from employee.csv
-employee_codes = set()
+approved_file = "approved_2025_output.csv"
+output_file = "leave_analysis_report.csv"
+windows_output_file = "leave_analysis_windows_report.csv"
 
-with open("employee.csv", mode="r", encoding="utf-8") as emp_file:
-    reader = csv.reader(emp_file)
-    for row in reader:
-        if len(row) >= 3:
-            code = row[2].strip().strip('"')
-            if code.isdigit() or code.startswith(("60", "12")):
-                employee_codes.add(code)
+report_header = ["Employee Code", "Status", "PID(s)", "Leave Start", "Leave End"]
 
-print(f"Loaded {len(employee_codes)} employee codes.")
+# Report rows computed before each write, so --metrics can time compute and write apart while streaming
+REPORT_BATCH_ROWS = 10000
 
-# Load approved leaves from approved_2025_output.csv
-leave_records = {}
 
-with open("approved_2025_output.csv", mode="r", encoding="utf-8") as out_file:
-    reader = csv.DictReader(out_file)
-    for row in reader:
-        emp_code = row["Employee Code"]
-        pid = row["PID"]
-        start_date = datetime.strptime(row["Start Date"], "%d/%m/%Y")
-        end_date = datetime.strptime(row["End Date"], "%d/%m/%Y")
+def collect_leave_records(rows):
+    """
+    Stores approved rows (in filtered_output.csv column order, without header)
+    as a LeaveColumns: parallel arrays of PIDs and start/end day numbers,
+    grouped by Employee Code.
+    """
+    return LeaveColumns.from_rows(rows)
 
-        if emp_code not in leave_records:
-            leave_records[emp_code] = []
 
-        leave_records[emp_code].append({
-            "PID": pid,
-            "Start Date": start_date,
-            "End Date": end_date
-        })
+def load_leave_records(approved_file):
+    """Reads approved_2025_output.csv into the same structure as collect_leave_records."""
+    with open(approved_file, mode="r", encoding="utf-8") as out_file:
+        reader = csv.reader(out_file)
+        next(reader, None)  # Skip header
+        return collect_leave_records(reader)
 
-print(f"Found leave data for {len(leave_records)} employees.")
 
-# Prepare final output
-results = {}
+def weekly_windows(year):
+    """Returns the 7-day windows of a year, starting on its first Saturday like the 14-20 June 2025 week."""
+    day = datetime(year, 1, 1)
+    day += timedelta(days=(5 - day.weekday()) % 7)
 
-for emp_code in employee_codes:
-    results[emp_code] = {"status": "no leave", "details": []}
+    windows = []
+    while day.year == year:
+        windows.append((day, day + timedelta(days=6)))
+        day += timedelta(days=7)
 
-    if emp_code not in leave_records:
-        continue
+    return windows
 
-    overlapping = []
-    full_coverage = False
 
-    for record in leave_records[emp_code]:
-        s = record["Start Date"]
-        e = record["End Date"]
+def analyze_windows(employee_codes, leave_columns, windows):
+    """
+    Yields one report row per employee (and per overlapping leave) for each window.
 
-        # Check for overlap
-        if not (e < start_check or s > end_check):
-            overlapping.append(record)
+    Each row is [window start, window end, Employee Code, Status, PID, Leave Start, Leave End].
+    """
+    pids, starts, ends = leave_columns.pids, leave_columns.starts, leave_columns.ends
 
-    if overlapping:
-        # Now check if fully covered
-        merged_dates = []
-        sorted_leaves = sorted(overlapping, key=lambda x: x["Start Date"])
+    for window_start, window_end in windows:
+        first_day, last_day = window_start.toordinal(), window_end.toordinal()
 
-        for interval in sorted_leaves:
-            if not merged_dates:
-                merged_dates.append(interval)
-            else:
-                last = merged_dates[-1]
-                if interval["Start Date"] <= last["End Date"]:
-                    # Overlap, merge
-                    new_start = last["Start Date"]
-                    new_end = max(last["End Date"], interval["End Date"])
-                    merged_dates[-1] = {
-                        "Start Date": new_start,
-                        "End Date": new_end,
-                        "PID": f"{last['PID']}, {interval['PID']}",
-                    }
-                else:
-                    merged_dates.append(interval)
-
-        # Now check if merged coverage includes full period
-        full_overlap = False
-        for merged in merged_dates:
-            if merged["Start Date"] <= start_check and merged["End Date"] >= end_check:
-                full_overlap = True
-                break
-
-        results[emp_code]["details"] = [
-            {
-                "PID": r["PID"],
-                "Leave Start": r["Start Date"].strftime("%d/%m/%Y"),
-                "Leave End": r["End Date"].strftime("%d/%m/%Y")
-            }
-            for r in overlapping
-        ]
+        for emp_code in employee_codes:
+            emp = leave_columns.employee(emp_code)
+            overlapping = leave_columns.overlapping(emp, first_day, last_day) if emp is not None else []
 
-        if full_overlap:
-            results[emp_code]["status"] = "fully covered"
-        else:
-            results[emp_code]["status"] = "partially covered"
+            if not overlapping:
+                yield [window_start, window_end, emp_code, "no leave", "", "", ""]
+                continue
 
-# Save results to CSV
-output_file = "leave_analysis_report.csv"
+            # Now check if merged coverage includes full period
+            if leave_columns.is_fully_covered(emp, first_day, last_day):
+                status = "fully covered"
+            else:
+                status = "partially covered"
 
-with open(output_file, mode="w", newline="", encoding="utf-8") as report_file:
-    writer = csv.writer(report_file)
-    writer.writerow([
-        "Employee Code",
-        "Status",
-        "PID(s)",
-        "Leave Start",
-        "Leave End"
-    ])
-
-    for emp_code, info in results.items():
-        if info["status"] == "no leave":
-            writer.writerow([emp_code, "no leave", "", "", ""])
-        else:
-            for entry in info["details"]:
-                writer.writerow([
+            for k in overlapping:
+                yield [
+                    window_start,
+                    window_end,
                     emp_code,
-                    info["status"],
-                    entry["PID"],
-                    entry["Leave Start"],
-                    entry["Leave End"]
-                ])
-
-print(f"\n✅ Leave analysis completed.")
-print(f"Results saved to '{output_file}'")
\ No newline at end of file
+                    status,
+                    pids[k],
+                    day_text(starts[k]),
+                    day_text(ends[k]),
+                ]
+
+
+def write_report(report_path, header, rows, metrics=None):
+    """
+    Streams report rows into a CSV a batch at a time, timing the batch's
+    computation as the 'compute' phase and its writing as the 'write' phase.
+    Returns the number of rows written.
+    """
+    rows = iter(rows)
+    written = 0
+    with open(report_path, mode="w", newline="", encoding="utf-8") as report_file:
+        writer = csv.writer(report_file)
+        writer.writerow(header)
+        while True:
+            with optional_phase(metrics, "compute"):
+                batch = list(itertools.islice(rows, REPORT_BATCH_ROWS))
+            if not batch:
+                return written
+            with optional_phase(metrics, "write"):
+                writer.writerows(batch)
+            written += len(batch)
+
+
+def analyze_windows_incremental(conn, employee_codes, windows):
+    """
+    Same rows as analyze_windows, but coverage is only recomputed for
+    employees whose approved records changed in the state store (see
+    leave_state.py) since it was last cached for the window.
+    """
+    versions = leave_state.employee_versions(conn, "approved")
+
+    for window_start, window_end in windows:
+        window_key = f"{window_start:%d/%m/%Y}-{window_end:%d/%m/%Y}"
+        cached = leave_state.cached_coverage(conn, window_key)
+        stale = [
+            emp_code for emp_code in employee_codes
+            if emp_code not in cached or cached[emp_code][0] != versions.get(emp_code, 0)
+        ]
+        print(f"Recomputing coverage for {len(stale)} of {len(employee_codes)} employees ({window_key}).")
+
+        leave_columns = collect_leave_records(leave_state.stage_rows(conn, "approved", stale))
+        recomputed = {emp_code: (versions.get(emp_code, 0), []) for emp_code in stale}
+        for row in analyze_windows(stale, leave_columns, [(window_start, window_end)]):
+            recomputed[row[2]][1].append(row[2:])
+        leave_state.save_coverage(conn, window_key, recomputed)
+        cached.update(recomputed)
+
+        for emp_code in employee_codes:
+            for row in cached[emp_code][1]:
+                yield [window_start, window_end] + row
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report leave coverage of one or more date windows.")
+    parser.add_argument("--window", nargs=2, action="append", metavar=("START", "END"),
+                        help="window to check as DD/MM/YYYY DD/MM/YYYY; can be repeated")
+    parser.add_argument("--weekly", type=int, metavar="YEAR",
+                        help="check every Saturday-Friday week of YEAR")
+    parser.add_argument("--state", action="store_true",
+                        help=f"read approved leaves from {leave_state.STATE_DB} (synced with {approved_file} "
+                             "first) and only recompute employees whose leaves changed")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    metrics = metrics_from_args("06 analyze", args, profile_phase="compute")
+
+    windows = [
+        (datetime.strptime(start, "%d/%m/%Y"), datetime.strptime(end, "%d/%m/%Y"))
+        for start, end in (args.window or [])
+    ]
+    if args.weekly:
+        windows.extend(weekly_windows(args.weekly))
+
+    with optional_phase(metrics, "load"):
+        # Load employee codes from employee.csv
+        employee_codes = load_employee_codes("employee.csv")
+        print(f"Loaded {len(employee_codes)} employee codes.")
+
+        if args.state:
+            # Bring the store up to date with the approved CSV first, so a store
+            # left behind by an older '04 approved.py' run is never trusted as is
+            if os.path.exists(approved_file):
+                changed, removed = leave_state.sync_stage_file("approved", approved_file)
+                print(f"State store synced with '{approved_file}': {changed} new or changed, {removed} removed records.")
+            conn = leave_state.open_store()
+            if not leave_state.stage_record_count(conn, "approved"):
+                print(f"❌ No approved records in {leave_state.STATE_DB}. "
+                      f"Run '04 approved.py --state' or create '{approved_file}' first.")
+                sys.exit(1)
+
+            if metrics:
+                record_counts = leave_state.stage_employee_counts(conn, "approved")
+                metrics.rows_in = sum(record_counts.values())
+                metrics.reject("not in roster", sum(
+                    count for emp_code, count in record_counts.items() if emp_code not in employee_codes
+                ))
+
+            def analyze(windows):
+                return analyze_windows_incremental(conn, employee_codes, windows)
+        else:
+            # Load approved leaves from approved_2025_output.csv into columns once
+            leave_columns = load_leave_records(approved_file)
+            print(f"Found leave data for {len(leave_columns)} employees.")
+
+            if metrics:
+                metrics.rows_in = leave_columns.record_count
+                metrics.reject("not in roster", sum(
+                    leave_columns.leave_count(emp) for emp, emp_code in enumerate(leave_columns.codes)
+                    if emp_code not in employee_codes
+                ))
+
+            def analyze(windows):
+                return analyze_windows(employee_codes, leave_columns, windows)
+
+    if windows:
+        # Save every window to one report with the window in the first columns
+        report_rows = write_report(windows_output_file, ["Window Start", "Window End"] + report_header, (
+            [row[0].strftime("%d/%m/%Y"), row[1].strftime("%d/%m/%Y")] + row[2:]
+            for row in analyze(windows)
+        ), metrics)
+
+        print(f"\n✅ Leave analysis completed for {len(windows)} windows.")
+        print(f"Results saved to '{windows_output_file}'")
+    else:
+        # Save results to CSV
+        report_rows = write_report(output_file, report_header,
+                                   (row[2:] for row in analyze([(start_check, end_check)])), metrics)
+
+        print(f"\n✅ Leave analysis completed.")
+        print(f"Results saved to '{output_file}'")
+
+    if metrics:
+        metrics.rows_out = report_rows
+        metrics.write()
@@ -1,41 +1,219 @@
+import argparse
+import contextlib
+import glob
+import io
 import pandas as pd
-from datetime import datetime, timedelta
+import openpyxl
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 import os # Import os module to get current working directory
 
+from leave_intervals import uncovered_segments
+from metrics import add_metrics_arguments, metrics_from_args, optional_phase
+
 # Define the reference period for "no leave" and for calculating overlap
 REFERENCE_START_DATE = datetime(2025, 6, 14)
 REFERENCE_END_DATE = datetime(2025, 6, 20)
 
-def update_excel_with_leave_data(excel_file_path, csv_file_path, output_file_path):
+# The first row is the 'Al Shamiyah Project' title, so the header is on row 2 (1-based)
+HEADER_ROW = 2
+
+# Other sheets may have more or fewer title rows; the header is the first row with an 'ID' cell
+HEADER_SCAN_ROWS = 10
+
+# Sheet name that selects every sheet of a workbook
+ALL_SHEETS = '*'
+
+# Batch outputs are saved as '<name>_updated.xlsx', like 'AL HARAM PROJECTS_updated.xlsx'
+UPDATED_SUFFIX = '_updated'
+
+def report_leaves_by_employee(df_csv):
     """
-    Updates 'Start Date' and 'End Date' columns in an Excel sheet based on
-    leave data from a CSV file.
+    Groups the parseable leave rows of the report by 'Employee Code'.
 
     Args:
-        excel_file_path (str): Path to the input Excel file (e.g., 'AL HARAM PROJECTS.xlsx').
-        csv_file_path (str): Path to the input CSV file (e.g., 'leave_analysis_report.csv').
-        output_file_path (str): Path where the updated Excel file will be saved.
+        df_csv (pd.DataFrame): The leave analysis report.
+
+    Returns:
+        dict: Employee Code -> list of dicts with 'PID', 'Start Date' and 'End Date' keys.
     """
-    # Print current working directory for debugging
-    print(f"Current working directory: {os.getcwd()}")
+    leave_start = pd.to_datetime(df_csv['Leave Start'].astype(str), format='%d/%m/%Y', errors='coerce')
+    leave_end = pd.to_datetime(df_csv['Leave End'].astype(str), format='%d/%m/%Y', errors='coerce')
 
-    try:
-        # Load the Excel file (.xlsx)
-        # We need to specify header=1 because the first row is 'Al Shamiyah Project'
-        df_excel = pd.read_excel(excel_file_path, header=1) # Read the second row (index 1) as header
-        print(f"Successfully loaded Excel file: {excel_file_path}")
-        # Clean column names by stripping whitespace
-        df_excel.columns = df_excel.columns.str.strip()
-        # --- DEBUGGING AID: Print Excel columns after stripping ---
-        print(f"Excel columns after stripping: {df_excel.columns.tolist()}")
-        # ---------------------------------------------------------
-    except FileNotFoundError:
-        print(f"Error: Excel file '{excel_file_path}' not found. Please ensure it's in the correct directory.")
-        return
-    except Exception as e:
-        print(f"Error loading Excel file '{excel_file_path}': {e}")
-        return
+    leaves_by_employee = {}
+    for employee_code, pid, start, end in zip(df_csv['Employee Code'], df_csv['PID(s)'], leave_start, leave_end):
+        if pd.notna(start) and pd.notna(end):
+            leaves_by_employee.setdefault(employee_code, []).append({
+                "PID": pid,
+                "Start Date": start.to_pydatetime(),
+                "End Date": end.to_pydatetime(),
+            })
+
+    return leaves_by_employee
+
+
+def leaves_text(leaves):
+    """
+    Describes leaves from report_leaves_by_employee as 'PID (Original Leave: DD Month YYYY - DD Month YYYY)',
+    joined with ', ', for the 'Coverage Status' of an employee whose leaves were all subtracted.
+    """
+    descriptions = []
+    for leave in leaves:
+        pid = leave['PID']
+        if isinstance(pid, float) and pid.is_integer():
+            pid = int(pid)  # 640968.0 -> 640968
+        descriptions.append(
+            f"{pid} (Original Leave: {leave['Start Date'].strftime('%d %B %Y')}"
+            f" - {leave['End Date'].strftime('%d %B %Y')})"
+        )
+    return ', '.join(descriptions)
+
+
+def apply_leave_data(df_excel, df_csv, rejected=None):
+    """
+    Fills 'Start Date', 'End Date' and 'Coverage Status' for every row of
+    df_excel in one keyed lookup of its 'ID' column against the report's
+    'Employee Code', using column-wise operations instead of a per-row scan.
+
+    Args:
+        df_excel (pd.DataFrame): The project sheet; updated in place.
+        df_csv (pd.DataFrame): The leave analysis report.
+        rejected (Counter, optional): Counts rows left blank, by reason.
+    """
+    index = df_excel.index
+    reference_start_text = REFERENCE_START_DATE.strftime('%d %B %Y')
+    reference_end_text = REFERENCE_END_DATE.strftime('%d %B %Y')
+
+    # Index the report by 'Employee Code', keeping the first row per employee,
+    # and look up every Excel ID at once (-1 means no match)
+    report = df_csv.drop_duplicates(subset='Employee Code', keep='first').set_index('Employee Code')
+    positions = report.index.get_indexer(df_excel['ID'])
+    positions[df_excel['ID'].isna().to_numpy()] = -1
+    matched = pd.Series(positions >= 0, index=index)
+    matches = report.reset_index().reindex(positions).set_index(index)
+
+    status = matches['Status']
+    pid = matches['PID(s)']
+    csv_leave_start = matches['Leave Start']
+    csv_leave_end = matches['Leave End']
+
+    # Format PID as a whole number if it's a float (e.g., 640968.0 -> 640968)
+    formatted_pid = pd.Series('', index=index, dtype=object)
+    has_pid = matched & pid.notna()
+    formatted_pid[has_pid] = pid[has_pid].astype('int64').astype(str)
+    pid_is_set = has_pid & (formatted_pid != '0')
+
+    # Parse CSV leave dates if available, for use in both fully and partially covered cases
+    has_dates = matched & csv_leave_start.notna() & csv_leave_end.notna()
+    leave_start = pd.to_datetime(csv_leave_start[has_dates].astype(str), format='%d/%m/%Y', errors='coerce').reindex(index)
+    leave_end = pd.to_datetime(csv_leave_end[has_dates].astype(str), format='%d/%m/%Y', errors='coerce').reindex(index)
+    has_parsed = has_dates & leave_start.notna() & leave_end.notna()
+    unparsed = has_dates & ~has_parsed
+    for row in unparsed[unparsed].index:
+        print(f"Warning: Could not parse raw leave dates '{csv_leave_start[row]}', '{csv_leave_end[row]}' for Employee ID {df_excel.at[row, 'ID']}.")
+
+    # Construct original leave period text for use in status messages
+    original_leave_period_text = pd.Series('', index=index, dtype=object)
+    original_leave_period_text[has_parsed] = (
+        ' (Original Leave: ' + leave_start[has_parsed].dt.strftime('%d %B %Y')
+        + ' - ' + leave_end[has_parsed].dt.strftime('%d %B %Y') + ')'
+    )
+    pid_and_period = formatted_pid + original_leave_period_text
+
+    # Unmatched rows and unknown statuses are left blank
+    start_date = pd.Series('', index=index, dtype=object)
+    end_date = pd.Series('', index=index, dtype=object)
+    coverage_status = pd.Series('', index=index, dtype=object)
+
+    # If status is "no leave", fill with the reference period
+    no_leave = matched & (status == 'no leave')
+    start_date[no_leave] = reference_start_text
+    end_date[no_leave] = reference_end_text
+
+    # If status is "fully covered", mention PID and original leave dates in 'Start Date'
+    fully_covered = matched & (status == 'fully covered') & pid_is_set
+    start_date[fully_covered] = pid_and_period[fully_covered]
+
+    partially_covered = matched & (status == 'partially covered')
+
+    # If leave start/end are missing in CSV for 'partially covered',
+    # assume the entire reference period is uncovered for them.
+    dates_missing = partially_covered & ~has_parsed
+    start_date[dates_missing] = reference_start_text
+    end_date[dates_missing] = reference_end_text
+    coverage_status[dates_missing] = (
+        'Partially Covered (PID: ' + pid_and_period[dates_missing]
+        + ', Dates Missing in CSV, assuming full reference uncovered)'
+    )
 
+    # Subtract every parsed leave of the employee from the reference period
+    # and report all uncovered segments, not only the first one
+    leaves_by_employee = report_leaves_by_employee(df_csv)
+    with_dates = partially_covered & has_parsed
+    for row in with_dates[with_dates].index:
+        leaves = leaves_by_employee.get(matches.at[row, 'Employee Code'], [])
+        segments = uncovered_segments(REFERENCE_START_DATE, REFERENCE_END_DATE, leaves)
+        # Name every leave that was subtracted, not only the first report row's
+        subtracted = leaves_text(leaves) or pid_and_period[row]
+
+        if segments:
+            first_uncovered_start, first_uncovered_end = segments[0]
+            start_date[row] = first_uncovered_start.strftime('%d %B %Y')
+            end_date[row] = first_uncovered_end.strftime('%d %B %Y')
+
+            # Provide more detail if there are multiple uncovered segments, and include PID
+            if len(segments) > 1:
+                segment_text = '; '.join(
+                    f"{segment_start.strftime('%d %B %Y')} - {segment_end.strftime('%d %B %Y')}"
+                    for segment_start, segment_end in segments
+                )
+                coverage_status[row] = f'Partially Covered (PID: {subtracted}, Multiple uncovered segments: {segment_text})'
+            else:
+                coverage_status[row] = f'Partially Covered (PID: {subtracted})'
+        else:
+            # If no uncovered days were found, the existing partial leave(s)
+            # fully cover the entire reference period [14-20 June].
+            coverage_status[row] = f'Fully Covered by Existing Partial Leave (PID: {subtracted})'
+
+    # Handle unexpected status values
+    unknown_status = matched & ~(no_leave | (status == 'fully covered') | partially_covered)
+    for row in unknown_status[unknown_status].index:
+        print(f"Warning: Unknown status '{status[row]}' for Employee ID {df_excel.at[row, 'ID']}. Skipping.")
+
+    if rejected is not None:
+        rejected['ID not in report'] += int((~matched).sum())
+        rejected['unknown status'] += int(unknown_status.sum())
+
+    df_excel['Start Date'] = start_date
+    df_excel['End Date'] = end_date
+    df_excel['Coverage Status'] = coverage_status
+
+
+def report_frame(rows):
+    """
+    Builds the leave analysis report DataFrame from in-memory rows, typed the
+    way pd.read_csv would type 'leave_analysis_report.csv'.
+
+    Args:
+        rows (iterable): [Employee Code, Status, PID(s), Leave Start, Leave End] lists of strings.
+    """
+    df_csv = pd.DataFrame(list(rows), columns=['Employee Code', 'Status', 'PID(s)', 'Leave Start', 'Leave End'])
+    df_csv = df_csv.replace('', float('nan'))
+    for column in ('Employee Code', 'PID(s)'):
+        try:
+            df_csv[column] = pd.to_numeric(df_csv[column])
+        except ValueError:
+            pass  # Keep non-numeric codes as text, like read_csv does
+    return df_csv
+
+
+def load_leave_report(csv_file_path):
+    """
+    Loads the leave analysis report CSV with stripped column names.
+
+    Returns:
+        pd.DataFrame: The report, or None if it could not be loaded.
+    """
     try:
         # Load the CSV file containing leave analysis report
         df_csv = pd.read_csv(csv_file_path)
@@ -47,150 +225,376 @@ def update_excel_with_leave_data(excel_file_path, csv_file_path, output_file_pat
         # -------------------------------------------------------
     except FileNotFoundError:
         print(f"Error: CSV file '{csv_file_path}' not found. Please ensure it's in the correct directory.")
-        return
+        return None
     except Exception as e:
         print(f"Error loading CSV file '{csv_file_path}': {e}")
-        return
-
-    # Ensure 'Start Date' and 'End Date' columns exist in df_excel
-    if 'Start Date' not in df_excel.columns:
-        df_excel['Start Date'] = ''
-    if 'End Date' not in df_excel.columns:
-        df_excel['End Date'] = ''
-    
-    # Add a new column 'Coverage Status' for "partially covered" cases
-    if 'Coverage Status' not in df_excel.columns:
-        df_excel['Coverage Status'] = ''
-
-    # Iterate through each row in the Excel sheet to find employee matches
-    for index, excel_row in df_excel.iterrows():
+        return None
+
+    return df_csv
+
+
+def find_header_row(rows):
+    """
+    Returns the 1-based number of the first row holding an 'ID' cell, looking
+    at the first HEADER_SCAN_ROWS rows, or None if there is none.
+
+    Args:
+        rows (iterable): Row value tuples of a sheet, from its first row.
+    """
+    for number, row in enumerate(rows, start=1):
+        if number > HEADER_SCAN_ROWS:
+            break
+        if any(value is not None and str(value).strip() == 'ID' for value in row):
+            return number
+    return None
+
+
+def select_sheets(workbook, sheet_names=None):
+    """
+    Returns the worksheets to update: the first sheet by default, every sheet
+    if sheet_names contains ALL_SHEETS, otherwise the named ones (missing
+    names are reported and skipped).
+    """
+    if not sheet_names:
+        return [workbook.worksheets[0]]
+    if ALL_SHEETS in sheet_names:
+        return list(workbook.worksheets)
+
+    sheets = []
+    for name in sheet_names:
+        if name in workbook.sheetnames:
+            sheets.append(workbook[name])
+        else:
+            print(f"Error: sheet '{name}' not found. Available sheets: {workbook.sheetnames}")
+    return sheets
+
+
+def sheet_header_rows(excel_file_path, sheet_names=None):
+    """
+    Returns {sheet name: header row (1-based)} for the selected sheets, found
+    with find_header_row and falling back to HEADER_ROW.
+    """
+    workbook = openpyxl.load_workbook(excel_file_path, read_only=True)
+    try:
+        return {
+            sheet.title: find_header_row(sheet.iter_rows(max_row=HEADER_SCAN_ROWS, values_only=True)) or HEADER_ROW
+            for sheet in select_sheets(workbook, sheet_names)
+        }
+    finally:
+        workbook.close()
+
+
+def update_excel_with_leave_data(excel_file_path, csv_file_path, output_file_path, df_csv=None, metrics=None,
+                                 sheet_names=None):
+    """
+    Updates 'Start Date' and 'End Date' columns in an Excel sheet based on
+    leave data from a CSV file.
+
+    Args:
+        excel_file_path (str): Path to the input Excel file (e.g., 'AL HARAM PROJECTS.xlsx').
+        csv_file_path (str): Path to the input CSV file (e.g., 'leave_analysis_report.csv').
+        output_file_path (str): Path where the updated Excel file will be saved.
+        df_csv (pd.DataFrame, optional): An already built report (see report_frame);
+            when given, csv_file_path is not read.
+        metrics (StageMetrics, optional): Records load/compute/write timings and row counts.
+        sheet_names (list, optional): Sheets to update (see select_sheets); by
+            default the first one, saved as 'Sheet1'. The header row of each
+            sheet is detected (see find_header_row).
+
+    Returns:
+        bool: True if the updated workbook was saved; False if it could not be
+        loaded or saved, or if no selected sheet could be updated (e.g. no 'ID' column).
+    """
+    # Print current working directory for debugging
+    print(f"Current working directory: {os.getcwd()}")
+
+    with optional_phase(metrics, 'load'):
+        try:
+            header_rows = sheet_header_rows(excel_file_path, sheet_names)
+            sheets = {}
+            for sheet_name, header_row in header_rows.items():
+                # Load the Excel file (.xlsx)
+                # The header is usually on row 2 because the first row is 'Al Shamiyah Project'
+                df_excel = pd.read_excel(excel_file_path, sheet_name=sheet_name, header=header_row - 1)
+                # Clean column names by stripping whitespace
+                df_excel.columns = df_excel.columns.astype(str).str.strip()
+                sheets[sheet_name] = df_excel
+            print(f"Successfully loaded Excel file: {excel_file_path}")
+            for sheet_name, df_excel in sheets.items():
+                # --- DEBUGGING AID: Print Excel columns after stripping ---
+                print(f"Excel columns after stripping: {df_excel.columns.tolist()}")
+                # ---------------------------------------------------------
+        except FileNotFoundError:
+            print(f"Error: Excel file '{excel_file_path}' not found. Please ensure it's in the correct directory.")
+            return False
+        except Exception as e:
+            print(f"Error loading Excel file '{excel_file_path}': {e}")
+            return False
+
+        if df_csv is None:
+            df_csv = load_leave_report(csv_file_path)
+            if df_csv is None:
+                return False
+
+    with optional_phase(metrics, 'compute'):
+        updated_sheets = 0
+        for df_excel in sheets.values():
+            # Ensure 'Start Date' and 'End Date' columns exist in df_excel
+            if 'Start Date' not in df_excel.columns:
+                df_excel['Start Date'] = ''
+            if 'End Date' not in df_excel.columns:
+                df_excel['End Date'] = ''
+
+            # Add a new column 'Coverage Status' for "partially covered" cases
+            if 'Coverage Status' not in df_excel.columns:
+                df_excel['Coverage Status'] = ''
+
+            if 'ID' not in df_excel.columns:
+                print(f"Error: 'ID' column not found in Excel sheet. Available columns: {df_excel.columns.tolist()}")
+            elif 'Employee Code' not in df_csv.columns:
+                print(f"Error: 'Employee Code' column not found in CSV file. Available columns: {df_csv.columns.tolist()}")
+            else:
+                apply_leave_data(df_excel, df_csv, metrics.rejected if metrics else None)
+                updated_sheets += 1
+
+            if metrics:
+                metrics.rows_in += len(df_excel)
+        if metrics:
+            metrics.rows_out = metrics.rows_in - sum(metrics.rejected.values())
+
+    if not updated_sheets:
+        print(f"Error: no sheet of '{excel_file_path}' could be updated; '{output_file_path}' was not saved.")
+        return False
+
+    with optional_phase(metrics, 'write'):
+        # Save the updated Excel file
         try:
-            employee_id = excel_row['ID'] 
-        except KeyError:
-            print(f"Error: 'ID' column not found in Excel row at index {index}. Available columns: {df_excel.columns.tolist()}")
-            continue # Skip this row and proceed to the next
+            if not sheet_names:
+                next(iter(sheets.values())).to_excel(output_file_path, index=False, sheet_name='Sheet1')
+            else:
+                with pd.ExcelWriter(output_file_path) as writer:
+                    for sheet_name, df_excel in sheets.items():
+                        df_excel.to_excel(writer, index=False, sheet_name=sheet_name)
+            print(f"Successfully updated Excel file saved as: {output_file_path}")
+        except Exception as e:
+            print(f"Error saving updated Excel file '{output_file_path}': {e}")
+            return False
+
+    return True
+
+
+def update_workbook_cells(excel_file_path, csv_file_path, output_file_path, df_csv=None, metrics=None,
+                          sheet_names=None):
+    """
+    Same update as update_excel_with_leave_data, but only the 'Start Date',
+    'End Date' and 'Coverage Status' cells whose value changes are written
+    back through openpyxl. The title row, formatting, formulas and other
+    sheets of the workbook are kept.
+
+    Each selected sheet is read once in read-only mode for its 'ID' column
+    and the current values of the three output columns; its header row is
+    detected (usually row 2, below the 'Al Shamiyah Project' title row).
+
+    Args:
+        excel_file_path (str): Path to the input Excel file (e.g., 'AL HARAM PROJECTS.xlsx').
+        csv_file_path (str): Path to the input CSV file (e.g., 'leave_analysis_report.csv').
+        output_file_path (str): Path where the updated Excel file will be saved (may be excel_file_path).
+        df_csv (pd.DataFrame, optional): An already built report (see report_frame);
+            when given, csv_file_path is not read.
+        metrics (StageMetrics, optional): Records load/compute/write timings and row counts.
+        sheet_names (list, optional): Sheets to update (see select_sheets); by default the first one.
+
+    Returns:
+        bool: True if the updated workbook was saved; False if it could not be
+        loaded or saved, or if no selected sheet has an 'ID' column.
+    """
+    output_columns = ['Start Date', 'End Date', 'Coverage Status']
+    sheets = []  # (sheet name, header row, headers, output positions, IDs, current values)
+
+    with optional_phase(metrics, 'load'):
+        try:
+            workbook = openpyxl.load_workbook(excel_file_path, read_only=True)
+            for sheet in select_sheets(workbook, sheet_names):
+                header_row = find_header_row(sheet.iter_rows(max_row=HEADER_SCAN_ROWS, values_only=True)) or HEADER_ROW
+                rows = sheet.iter_rows(min_row=header_row, values_only=True)
+                headers = [str(value).strip() if value is not None else '' for value in next(rows, ())]
+                if 'ID' not in headers:
+                    print(f"Error: 'ID' column not found in Excel sheet. Available columns: {headers}")
+                    continue
+                id_position = headers.index('ID')
+                output_positions = [headers.index(column) if column in headers else None for column in output_columns]
+
+                ids = []
+                current_values = []
+                for row in rows:
+                    ids.append(row[id_position] if id_position < len(row) else None)
+                    current_values.append([
+                        row[position] if position is not None and position < len(row) else None
+                        for position in output_positions
+                    ])
+                sheets.append((sheet.title, header_row, headers, output_positions, ids, current_values))
+            workbook.close()
+            if not sheets:
+                print(f"Error: no sheet of '{excel_file_path}' could be updated; '{output_file_path}' was not saved.")
+                return False
+            print(f"Successfully read {sum(len(sheet[4]) for sheet in sheets)} rows from Excel file: {excel_file_path}")
+        except FileNotFoundError:
+            print(f"Error: Excel file '{excel_file_path}' not found. Please ensure it's in the correct directory.")
+            return False
+        except Exception as e:
+            print(f"Error loading Excel file '{excel_file_path}': {e}")
+            return False
 
-        # Find the corresponding employee in the CSV data using 'Employee Code'
+        if df_csv is None:
+            df_csv = load_leave_report(csv_file_path)
+            if df_csv is None:
+                return False
         if 'Employee Code' not in df_csv.columns:
             print(f"Error: 'Employee Code' column not found in CSV file. Available columns: {df_csv.columns.tolist()}")
-            break # Stop processing if crucial CSV column is missing
-
-        matching_employee = df_csv[df_csv['Employee Code'] == employee_id]
-
-        if not matching_employee.empty:
-            # Get the status and other relevant information from the first match
-            status = matching_employee['Status'].iloc[0]
-            pid = matching_employee['PID(s)'].iloc[0]
-            csv_leave_start_str = matching_employee['Leave Start'].iloc[0]
-            csv_leave_end_str = matching_employee['Leave End'].iloc[0]
-
-            # Format PID as a whole number if it's a float (e.g., 640968.0 -> 640968)
-            formatted_pid = int(pid) if pd.notna(pid) else ''
-
-            # Parse CSV leave dates if available, for use in both fully and partially covered cases
-            leave_start_csv_dt = None
-            leave_end_csv_dt = None
-            if pd.notna(csv_leave_start_str) and pd.notna(csv_leave_end_str):
-                try:
-                    leave_start_csv_dt = datetime.strptime(str(csv_leave_start_str), '%d/%m/%Y')
-                    leave_end_csv_dt = datetime.strptime(str(csv_leave_end_str), '%d/%m/%Y')
-                except ValueError:
-                    print(f"Warning: Could not parse raw leave dates '{csv_leave_start_str}', '{csv_leave_end_str}' for Employee ID {employee_id}.")
-
-            # Construct original leave period text for use in status messages
-            original_leave_period_text = ""
-            if leave_start_csv_dt and leave_end_csv_dt:
-                original_leave_period_text = f" (Original Leave: {leave_start_csv_dt.strftime('%d %B %Y')} - {leave_end_csv_dt.strftime('%d %B %Y')})"
-
-            if status == 'no leave':
-                # If status is "no leave", fill with the reference period
-                df_excel.at[index, 'Start Date'] = REFERENCE_START_DATE.strftime('%d %B %Y')
-                df_excel.at[index, 'End Date'] = REFERENCE_END_DATE.strftime('%d %B %Y')
-                df_excel.at[index, 'Coverage Status'] = '' # Clear if previously set
-            elif status == 'fully covered':
-                # If status is "fully covered", mention PID and original leave dates in 'Start Date'
-                df_excel.at[index, 'Start Date'] = f"{formatted_pid}{original_leave_period_text}" if formatted_pid else ''
-                df_excel.at[index, 'End Date'] = '' # Clear 'End Date'
-                df_excel.at[index, 'Coverage Status'] = '' # Clear if previously set
-            elif status == 'partially covered':
-                if leave_start_csv_dt and leave_end_csv_dt:
-                    try:
-                        # Generate all days in the reference period
-                        ref_days = set()
-                        current_day = REFERENCE_START_DATE
-                        while current_day <= REFERENCE_END_DATE:
-                            ref_days.add(current_day)
-                            current_day += timedelta(days=1)
-
-                        # Generate all days covered by the employee's actual leave
-                        leave_days_covered = set()
-                        # Only add days to leave_days_covered if leave period is valid and overlaps with or touches reference period
-                        if leave_start_csv_dt <= leave_end_csv_dt and \
-                           not (leave_end_csv_dt < REFERENCE_START_DATE or leave_start_csv_dt > REFERENCE_END_DATE):
-                            current_day = leave_start_csv_dt
-                            while current_day <= leave_end_csv_dt:
-                                leave_days_covered.add(current_day)
-                                current_day += timedelta(days=1)
-                        
-                        # Find days in reference period that are NOT covered by the employee's leave
-                        uncovered_days_in_reference = sorted(list(ref_days - leave_days_covered))
-
-                        if uncovered_days_in_reference:
-                            # Extract the first contiguous block of uncovered days
-                            first_uncovered_start = uncovered_days_in_reference[0]
-                            first_uncovered_end = first_uncovered_start
-                            for i in range(1, len(uncovered_days_in_reference)):
-                                if uncovered_days_in_reference[i] == first_uncovered_end + timedelta(days=1):
-                                    first_uncovered_end = uncovered_days_in_reference[i]
-                                else:
-                                    # Found a gap, so the contiguous block ends here
-                                    break
-                            
-                            df_excel.at[index, 'Start Date'] = first_uncovered_start.strftime('%d %B %Y')
-                            df_excel.at[index, 'End Date'] = first_uncovered_end.strftime('%d %B %Y')
-                            
-                            # Provide more detail if there are multiple uncovered segments, and include PID
-                            if len(uncovered_days_in_reference) > (first_uncovered_end - first_uncovered_start).days + 1:
-                                df_excel.at[index, 'Coverage Status'] = f'Partially Covered (PID: {formatted_pid}{original_leave_period_text}, Multiple uncovered segments)'
-                            else:
-                                df_excel.at[index, 'Coverage Status'] = f'Partially Covered (PID: {formatted_pid}{original_leave_period_text})'
-
-                        else:
-                            # If no uncovered days were found, it means the existing partial leave
-                            # fully covers the entire reference period [14-20 June].
-                            df_excel.at[index, 'Start Date'] = '' # No additional days need covering
-                            df_excel.at[index, 'End Date'] = ''
-                            df_excel.at[index, 'Coverage Status'] = f'Fully Covered by Existing Partial Leave (PID: {formatted_pid}{original_leave_period_text})'
-
-                    except ValueError:
-                        print(f"Warning: Error during date calculation for Employee ID {employee_id}. Setting default dates.")
-                        df_excel.at[index, 'Start Date'] = REFERENCE_START_DATE.strftime('%d %B %Y')
-                        df_excel.at[index, 'End Date'] = REFERENCE_END_DATE.strftime('%d %B %Y')
-                        df_excel.at[index, 'Coverage Status'] = f'Partially Covered (PID: {formatted_pid}{original_leave_period_text}, Calculation Error)'
-                else:
-                    # If leave start/end are missing in CSV for 'partially covered',
-                    # assume the entire reference period is uncovered for them.
-                    df_excel.at[index, 'Start Date'] = REFERENCE_START_DATE.strftime('%d %B %Y')
-                    df_excel.at[index, 'End Date'] = REFERENCE_END_DATE.strftime('%d %B %Y')
-                    df_excel.at[index, 'Coverage Status'] = f'Partially Covered (PID: {formatted_pid}{original_leave_period_text}, Dates Missing in CSV, assuming full reference uncovered)'
-            else:
-                # Handle unexpected status values
-                print(f"Warning: Unknown status '{status}' for Employee ID {employee_id}. Skipping.")
-                df_excel.at[index, 'Start Date'] = ''
-                df_excel.at[index, 'End Date'] = ''
-                df_excel.at[index, 'Coverage Status'] = ''
+            return False
+
+    with optional_phase(metrics, 'compute'):
+        updated_frames = []
+        for _, _, _, _, ids, _ in sheets:
+            df_excel = pd.DataFrame({'ID': ids})
+            apply_leave_data(df_excel, df_csv, metrics.rejected if metrics else None)
+            updated_frames.append(df_excel)
+
+            if metrics:
+                metrics.rows_in += len(df_excel)
+        if metrics:
+            metrics.rows_out = metrics.rows_in - sum(metrics.rejected.values())
+
+    with optional_phase(metrics, 'write'):
+        try:
+            workbook = openpyxl.load_workbook(excel_file_path)
+            changed_cells = 0
+
+            for (sheet_name, header_row, headers, output_positions, _, current_values), df_excel in zip(sheets, updated_frames):
+                sheet = workbook[sheet_name]
+
+                # Add any missing output column after the last header cell
+                for i, column in enumerate(output_columns):
+                    if output_positions[i] is None:
+                        output_positions[i] = len(headers)
+                        headers.append(column)
+                        sheet.cell(row=header_row, column=output_positions[i] + 1, value=column)
+
+                for offset, new_values in enumerate(df_excel[output_columns].itertuples(index=False)):
+                    for position, old_value, new_value in zip(output_positions, current_values[offset], new_values):
+                        new_value = new_value if new_value != '' else None
+                        if new_value != old_value:
+                            sheet.cell(row=header_row + 1 + offset, column=position + 1, value=new_value)
+                            changed_cells += 1
+
+            workbook.save(output_file_path)
+            print(f"Updated {changed_cells} cells; Excel file saved as: {output_file_path}")
+        except Exception as e:
+            print(f"Error saving updated Excel file '{output_file_path}': {e}")
+            return False
+
+    return True
+
+
+def batch_jobs(paths, output_dir=None):
+    """
+    Expands directories and glob patterns into (input workbook, output workbook) pairs.
+
+    Excel lock files ('~$...') and earlier outputs ('..._updated.xlsx') are
+    skipped. Outputs are named '<name>_updated.xlsx', next to the input or
+    in output_dir.
+    """
+    workbooks = []
+    for path in paths:
+        if os.path.isdir(path):
+            workbooks.extend(sorted(glob.glob(os.path.join(path, '*.xlsx'))))
         else:
-            # If employee ID is not found in the CSV, clear or leave blank
-            df_excel.at[index, 'Start Date'] = ''
-            df_excel.at[index, 'End Date'] = ''
-            df_excel.at[index, 'Coverage Status'] = ''
+            workbooks.extend(sorted(glob.glob(path)))
 
-    # Save the updated Excel file
-    try:
-        df_excel.to_excel(output_file_path, index=False, sheet_name='Sheet1')
-        print(f"Successfully updated Excel file saved as: {output_file_path}")
-    except Exception as e:
-        print(f"Error saving updated Excel file '{output_file_path}': {e}")
+    jobs = []
+    seen = set()
+    for workbook in workbooks:
+        name = os.path.basename(workbook)
+        stem = os.path.splitext(name)[0]
+        if name.startswith('~$') or stem.endswith(UPDATED_SUFFIX) or os.path.abspath(workbook) in seen:
+            continue
+        seen.add(os.path.abspath(workbook))
+        jobs.append((workbook, os.path.join(output_dir or os.path.dirname(workbook), f"{stem}{UPDATED_SUFFIX}.xlsx")))
+    return jobs
+
+
+# The leave report of a batch worker process, set once by init_batch_worker
+batch_report = None
+
+
+def init_batch_worker(df_csv):
+    """Process pool initializer: keeps the report each worker receives once, for all its workbooks."""
+    global batch_report
+    batch_report = df_csv
+
+
+def update_batch_job(excel_file_path, output_file_path, sheet_names, cell_update):
+    """
+    Updates one workbook in a batch worker from the shared report. Returns
+    (input, output, saved, captured output); the output is captured because
+    per-workbook messages would interleave across workers.
+    """
+    update = update_workbook_cells if cell_update else update_excel_with_leave_data
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        try:
+            saved = update(excel_file_path, None, output_file_path, df_csv=batch_report, sheet_names=sheet_names)
+        except Exception as e:
+            print(f"Error updating '{excel_file_path}': {e}")
+            saved = False
+    return excel_file_path, output_file_path, saved, log.getvalue()
+
+
+def update_workbooks_batch(jobs, csv_file_path, workers=None, sheet_names=None, cell_update=False, metrics=None):
+    """
+    Updates many workbooks concurrently with a process pool.
+
+    The leave report is loaded once here and handed to each worker process
+    once (through the pool initializer), not once per workbook.
+
+    Args:
+        jobs (list): (input workbook, output workbook) pairs, e.g. from batch_jobs.
+        csv_file_path (str): Path to the leave analysis report.
+        workers (int, optional): Worker processes; None uses every CPU core.
+        sheet_names (list, optional): Sheets to update in every workbook (see select_sheets).
+        cell_update (bool): Use update_workbook_cells instead of update_excel_with_leave_data.
+        metrics (StageMetrics, optional): Records load and compute timings.
+
+    Returns:
+        list: (input, output, saved) per workbook, in job order.
+    """
+    with optional_phase(metrics, 'load'):
+        df_csv = load_leave_report(csv_file_path)
+    if df_csv is None or not jobs:
+        return []
+
+    with optional_phase(metrics, 'compute'), \
+         ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(jobs)),
+                             initializer=init_batch_worker, initargs=(df_csv,)) as pool:
+        futures = [
+            pool.submit(update_batch_job, excel_file_path, output_file_path, sheet_names, cell_update)
+            for excel_file_path, output_file_path in jobs
+        ]
+        results = []
+        for future in futures:
+            excel_file_path, output_file_path, saved, log = future.result()
+            print(f"{'✅' if saved else '❌'} {excel_file_path} -> {output_file_path if saved else 'not updated'}")
+            if not saved:
+                # Show why, from the worker's captured output
+                for line in log.splitlines():
+                    print(f"    {line}")
+            results.append((excel_file_path, output_file_path, saved))
+
+    if metrics:
+        metrics.rows_in = len(jobs)
+        metrics.rows_out = sum(1 for _, _, saved in results if saved)
+        metrics.reject('workbook not updated', metrics.rows_in - metrics.rows_out)
+    return results
 
 
 # --- How to run the script ---
@@ -200,5 +604,34 @@ if __name__ == "__main__":
     csv_input = 'leave_analysis_report.csv'
     excel_output = 'AL HARAM PROJECTS_updated.xlsx' # Output will be a proper .xlsx file
 
+    parser = argparse.ArgumentParser(description="Fill Start Date / End Date in the project workbook from the leave analysis report.")
+    parser.add_argument('--cell-update', action='store_true',
+                        help="only write the changed cells back into a copy of the original workbook, "
+                             "keeping its title row, formatting, formulas and other sheets")
+    parser.add_argument('--batch', action='append', metavar='DIR_OR_GLOB',
+                        help="update every workbook in a directory or matching a glob (repeatable), "
+                             "concurrently, instead of the single project workbook")
+    parser.add_argument('--sheet', action='append', dest='sheets', metavar='NAME',
+                        help=f"sheet to update (repeatable; '{ALL_SHEETS}' for every sheet; default: the first sheet)")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="worker processes for --batch (default: 0 = every CPU core)")
+    parser.add_argument('--output-dir', help="where --batch writes the updated workbooks (default: next to each input)")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    metrics = metrics_from_args('07 leaveadjust', args, profile_phase='compute')
+
     # Run the function
-    update_excel_with_leave_data(excel_input, csv_input, excel_output)
+    if args.batch:
+        if args.output_dir:
+            os.makedirs(args.output_dir, exist_ok=True)
+        jobs = batch_jobs(args.batch, args.output_dir)
+        print(f"Updating {len(jobs)} workbooks.")
+        results = update_workbooks_batch(jobs, csv_input, args.workers or None, args.sheets, args.cell_update, metrics)
+        print(f"\n✅ {sum(1 for _, _, saved in results if saved)} of {len(jobs)} workbooks updated.")
+    elif args.cell_update:
+        update_workbook_cells(excel_input, csv_input, excel_output, metrics=metrics, sheet_names=args.sheets)
+    else:
+        update_excel_with_leave_data(excel_input, csv_input, excel_output, metrics=metrics, sheet_names=args.sheets)
+
+    if metrics:
+        metrics.write()
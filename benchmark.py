@@ -0,0 +1,156 @@
+import argparse
+import contextlib
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import runpy
+import time
+from datetime import datetime
+
+from generate_fixtures import FIXTURE_INFO_FILE
+from metrics import peak_rss_kb
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# --- Benchmark cases: each runs one stage's core function inside the fixture directory ---
+
+def bench_filter(stages, year):
+    employee_codes = stages.filter_stage.load_employee_codes('employee.csv')
+    stages.filter_stage.filter_file('output.csv', 'filtered_output.csv', employee_codes)
+
+
+def bench_checkmissing(stages, year):
+    runpy.run_path(os.path.join(SCRIPT_DIR, '03 checkmissing.py'), run_name='__main__')
+
+
+def bench_approved(stages, year):
+    with open('filtered_output.csv', mode='r', encoding='utf-8') as infile, \
+         open('approved_2025_output.csv', mode='w', newline='', encoding='utf-8') as outfile:
+        reader = csv.reader(infile)
+        writer = csv.writer(outfile)
+        writer.writerow(next(reader))
+        writer.writerows(stages.approved_stage.approved_rows(reader, year))
+
+
+def bench_checkmissing_approved(stages, year):
+    runpy.run_path(os.path.join(SCRIPT_DIR, '05 checkmissingApproved.py'), run_name='__main__')
+
+
+def bench_analyze(stages, year):
+    analyze_stage = stages.analyze_stage
+    employee_codes = analyze_stage.load_employee_codes('employee.csv')
+    leave_columns = analyze_stage.load_leave_records('approved_2025_output.csv')
+    with open(analyze_stage.output_file, mode='w', newline='', encoding='utf-8') as report_file:
+        writer = csv.writer(report_file)
+        writer.writerow(analyze_stage.report_header)
+        for row in analyze_stage.analyze_windows(employee_codes, leave_columns, [(analyze_stage.start_check, analyze_stage.end_check)]):
+            writer.writerow(row[2:])
+
+
+def bench_leaveadjust(stages, year):
+    stages.leaveadjust_stage.update_excel_with_leave_data(
+        'AL HARAM PROJECTS.xlsx', 'leave_analysis_report.csv', 'AL HARAM PROJECTS_updated.xlsx')
+
+
+def bench_leaveadjust_cells(stages, year):
+    stages.leaveadjust_stage.update_workbook_cells(
+        'AL HARAM PROJECTS.xlsx', 'leave_analysis_report.csv', 'AL HARAM PROJECTS_updated.xlsx')
+
+
+# In run order: each stage reads the previous stage's output
+CASES = {
+    '02 filter': bench_filter,
+    '03 checkmissing': bench_checkmissing,
+    '04 approved': bench_approved,
+    '05 checkmissingApproved': bench_checkmissing_approved,
+    '06 analyze': bench_analyze,
+    '07 leaveadjust': bench_leaveadjust,
+    '07 leaveadjust --cell-update': bench_leaveadjust_cells,
+}
+
+
+def run_case(case_name, fixture_dir, year, conn):
+    """Child process: runs one case and sends back its timings and memory use."""
+    import pipeline as stages  # Loads the numbered stage scripts
+
+    os.chdir(fixture_dir)
+    baseline_rss = peak_rss_kb()
+
+    with open(os.devnull, mode='w') as devnull, contextlib.redirect_stdout(devnull):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        CASES[case_name](stages, year)
+        cpu_seconds = time.process_time() - cpu_start
+        wall_seconds = time.perf_counter() - wall_start
+
+    conn.send({
+        'stage': case_name,
+        'wall_seconds': round(wall_seconds, 4),
+        'cpu_seconds': round(cpu_seconds, 4),
+        'baseline_rss_kb': baseline_rss,
+        'peak_rss_kb': peak_rss_kb(),
+    })
+    conn.close()
+
+
+def run_benchmarks(fixture_dir, case_names, year):
+    """Runs each case in a fresh process, so peak memory is per stage. Returns the result dicts."""
+    context = multiprocessing.get_context('spawn')
+    results = []
+
+    for case_name in case_names:
+        parent_conn, child_conn = context.Pipe(duplex=False)
+        process = context.Process(target=run_case, args=(case_name, os.path.abspath(fixture_dir), year, child_conn))
+        process.start()
+        child_conn.close()
+        try:
+            result = parent_conn.recv()
+        except EOFError:
+            result = {'stage': case_name, 'error': f"benchmark process exited with code {process.exitcode}"}
+        process.join()
+
+        results.append(result)
+        if 'error' in result:
+            print(f"❌ {case_name}: {result['error']}")
+        else:
+            print(f"⏱️ {case_name}: {result['wall_seconds']:.3f}s wall, {result['cpu_seconds']:.3f}s CPU, "
+                  f"peak RSS {result['peak_rss_kb']} KB")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time each pipeline stage on a fixture directory from generate_fixtures.py.")
+    parser.add_argument('fixture_dir', help="directory with employee.csv, output.csv and AL HARAM PROJECTS.xlsx")
+    parser.add_argument('--stage', action='append', choices=list(CASES), dest='stages',
+                        help="stage to run (repeatable; default: all, in pipeline order)")
+    parser.add_argument('--output', help="JSON results file (default: benchmark_<timestamp>.json in fixture_dir)")
+    args = parser.parse_args()
+
+    fixture_info = {}
+    info_path = os.path.join(args.fixture_dir, FIXTURE_INFO_FILE)
+    if os.path.exists(info_path):
+        with open(info_path, mode='r', encoding='utf-8') as info_file:
+            fixture_info = json.load(info_file)
+
+    started = datetime.now()
+    year = fixture_info.get('year', started.year)
+    results = run_benchmarks(args.fixture_dir, args.stages or list(CASES), year)
+
+    report = {
+        'started': started.isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'fixture_dir': os.path.abspath(args.fixture_dir),
+        'fixture': fixture_info,
+        'results': results,
+    }
+    output_path = args.output or os.path.join(args.fixture_dir, f"benchmark_{started:%Y%m%d_%H%M%S}.json")
+    with open(output_path, mode='w', encoding='utf-8') as output:
+        json.dump(report, output, indent=2)
+
+    print(f"\n✅ Benchmark results saved to '{output_path}'")
@@ -0,0 +1,240 @@
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from leave_columns import LeaveColumns, day_text
+from leave_intervals import uncovered_segments
+from roster import load_employee_codes
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Same reference week as '06 analyze.py', used when a query gives no dates
+DEFAULT_START = '14/06/2025'
+DEFAULT_END = '20/06/2025'
+
+
+def file_signature(path):
+    """Returns (size, mtime) of a file, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class CoverageIndex:
+    """
+    The roster and the approved leaves (as LeaveColumns), loaded once and
+    reloaded when employee.csv or the approved CSV changes on disk.
+    """
+
+    def __init__(self, employee_file, approved_file):
+        self.employee_file = employee_file
+        self.approved_file = approved_file
+        self.lock = threading.Lock()
+        self.signatures = None
+        self.employee_codes = set()
+        self.leave_columns = LeaveColumns.from_rows([])
+        self.loaded_at = None
+        self.reload_if_changed()
+
+    def reload_if_changed(self):
+        """Reloads both files if either changed since the last load. Returns True if it reloaded."""
+        signatures = (file_signature(self.employee_file), file_signature(self.approved_file))
+        if signatures == self.signatures:
+            return False
+
+        with self.lock:
+            if signatures == self.signatures:
+                return False  # Another request thread reloaded first
+
+            started = time.perf_counter()
+            try:
+                employee_codes = load_employee_codes(self.employee_file)
+                with open(self.approved_file, mode='r', encoding='utf-8') as approved_file:
+                    reader = csv.reader(approved_file)
+                    next(reader, None)  # Skip header
+                    leave_columns = LeaveColumns.from_rows(reader)
+            except (OSError, ValueError, IndexError, csv.Error) as e:
+                # E.g. a file caught half-written; keep serving the last good index
+                print(f"❌ Reload failed, keeping the previous data: {e}")
+                return False
+
+            # Swap in the new data only once it is complete
+            self.employee_codes, self.leave_columns = employee_codes, leave_columns
+            self.signatures = signatures
+            self.loaded_at = datetime.now()
+            print(f"🔄 Loaded {len(employee_codes)} employee codes and {leave_columns.record_count} approved leaves "
+                  f"in {time.perf_counter() - started:.3f}s.")
+            return True
+
+    def coverage(self, emp_code, window_start, window_end):
+        """Returns the coverage status of one employee and the leaves overlapping the window."""
+        leave_columns = self.leave_columns
+        first_day, last_day = window_start.toordinal(), window_end.toordinal()
+
+        emp = leave_columns.employee(emp_code)
+        overlapping = leave_columns.overlapping(emp, first_day, last_day) if emp is not None else []
+        if not overlapping:
+            status = "no leave"
+        elif leave_columns.is_fully_covered(emp, first_day, last_day):
+            status = "fully covered"
+        else:
+            status = "partially covered"
+
+        return {
+            'employee': emp_code,
+            'in_roster': emp_code in self.employee_codes,
+            'status': status,
+            'leaves': [
+                {'pid': leave_columns.pids[k],
+                 'start': day_text(leave_columns.starts[k]),
+                 'end': day_text(leave_columns.ends[k])}
+                for k in overlapping
+            ],
+        }
+
+    def coverage_summary(self, window_start, window_end):
+        """Returns the number of roster employees with each coverage status."""
+        summary = {"no leave": 0, "fully covered": 0, "partially covered": 0}
+        for emp_code in self.employee_codes:
+            summary[self.coverage(emp_code, window_start, window_end)['status']] += 1
+        return summary
+
+    def uncovered(self, emp_code, window_start, window_end):
+        """Returns the blocks of days in the window not covered by the employee's leaves."""
+        leaves = [
+            {'PID': leave['pid'],
+             'Start Date': datetime.strptime(leave['start'], '%d/%m/%Y'),
+             'End Date': datetime.strptime(leave['end'], '%d/%m/%Y')}
+            for leave in self.coverage(emp_code, window_start, window_end)['leaves']
+        ]
+        return [
+            {'start': start.strftime('%d/%m/%Y'), 'end': end.strftime('%d/%m/%Y')}
+            for start, end in uncovered_segments(window_start, window_end, leaves)
+        ]
+
+    def missing(self):
+        """Returns the roster employees without any approved leave, like '05 checkmissingApproved.py'."""
+        leave_columns = self.leave_columns
+        return sorted(code for code in self.employee_codes if leave_columns.employee(code) is None)
+
+
+class CoverageRequestHandler(BaseHTTPRequestHandler):
+    """
+    Answers GET requests with JSON:
+
+        /coverage?employee=CODE&start=DD/MM/YYYY&end=DD/MM/YYYY
+        /coverage?start=...&end=...          (status counts for the whole roster)
+        /uncovered?employee=CODE&start=...&end=...
+        /missing
+        /status
+    """
+
+    index = None  # Set by serve()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        started = time.perf_counter()
+
+        self.index.reload_if_changed()
+        try:
+            if url.path == '/coverage':
+                window_start, window_end = self.window(query)
+                if 'employee' in query:
+                    body = self.index.coverage(query['employee'], window_start, window_end)
+                else:
+                    body = {'summary': self.index.coverage_summary(window_start, window_end)}
+            elif url.path == '/uncovered':
+                window_start, window_end = self.window(query)
+                body = {'employee': self.employee(query),
+                        'segments': self.index.uncovered(self.employee(query), window_start, window_end)}
+            elif url.path == '/missing':
+                missing = self.index.missing()
+                body = {'count': len(missing), 'employees': missing}
+            elif url.path == '/status':
+                body = {
+                    'employee_file': self.index.employee_file,
+                    'approved_file': self.index.approved_file,
+                    'loaded_at': self.index.loaded_at.isoformat(timespec='seconds') if self.index.loaded_at else None,
+                    'employees': len(self.index.employee_codes),
+                    'approved_leaves': self.index.leave_columns.record_count,
+                }
+            else:
+                self.send_json(404, {'error': f"Unknown path '{url.path}'"})
+                return
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+            return
+
+        body['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        self.send_json(200, body)
+
+    @staticmethod
+    def employee(query):
+        if 'employee' not in query:
+            raise ValueError("Missing 'employee' parameter")
+        return query['employee']
+
+    @staticmethod
+    def window(query):
+        """Parses the start/end parameters (DD/MM/YYYY), defaulting to the 06 reference week."""
+        try:
+            window_start = datetime.strptime(query.get('start', DEFAULT_START), '%d/%m/%Y')
+            window_end = datetime.strptime(query.get('end', DEFAULT_END), '%d/%m/%Y')
+        except ValueError:
+            raise ValueError("Dates must be given as DD/MM/YYYY")
+        if window_end < window_start:
+            raise ValueError("'end' is before 'start'")
+        return window_start, window_end
+
+    def send_json(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass  # Keep the console for reload messages
+
+
+def serve(employee_file='employee.csv', approved_file='approved_2025_output.csv', host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """
+    Loads the data and returns a ThreadingHTTPServer ready for serve_forever().
+
+    Port 0 picks a free port; see server.server_address for the one chosen.
+    """
+    handler = type('BoundCoverageRequestHandler', (CoverageRequestHandler,),
+                   {'index': CoverageIndex(employee_file, approved_file)})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve leave coverage queries over HTTP on localhost, "
+                                                 "reloading when the input files change.")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"address to bind (default: {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument('--employees', default='employee.csv', help="roster CSV (default: employee.csv)")
+    parser.add_argument('--approved', default='approved_2025_output.csv',
+                        help="approved leaves from '04 approved.py' (default: approved_2025_output.csv)")
+    args = parser.parse_args()
+
+    server = serve(args.employees, args.approved, args.host, args.port)
+    host, port = server.server_address[:2]
+    print(f"✅ Coverage service listening on http://{host}:{port} (try /coverage?employee=CODE, /missing, /status)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    finally:
+        server.server_close()
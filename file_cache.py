@@ -0,0 +1,50 @@
+import os
+import pickle
+import tempfile
+
+
+def load_cached(source_file, cache_file, build, version=1):
+    """
+    Returns build(source_file), cached in cache_file as a pickle.
+
+    The cache is keyed by the source's absolute path, size and modification
+    time (and `version`, to be bumped when build's output changes), so it is
+    rebuilt automatically whenever the source changes. If the cache cannot be
+    read or written, build is simply called.
+
+    Args:
+        source_file (str): The file the result is derived from.
+        cache_file (str): Where the pickled result is kept.
+        build (callable): Parses source_file; its result must be picklable.
+        version (int): Part of the cache key.
+    """
+    stat = os.stat(source_file)
+    key = (version, os.path.abspath(source_file), stat.st_size, stat.st_mtime_ns)
+
+    try:
+        with open(cache_file, mode='rb') as cache:
+            cached_key, result = pickle.load(cache)
+        if cached_key == key:
+            return result
+    except (OSError, pickle.PickleError, EOFError, ValueError, TypeError):
+        pass  # Missing or unreadable cache: rebuild it
+
+    result = build(source_file)
+
+    temp_file = None
+    try:
+        cache_dir = os.path.dirname(os.path.abspath(cache_file))
+        fd, temp_file = tempfile.mkstemp(prefix='.cache_', dir=cache_dir)
+        with os.fdopen(fd, mode='wb') as cache:
+            pickle.dump((key, result), cache, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, cache_file)  # Atomic, so a concurrent stage never reads half a cache
+    except (OSError, pickle.PicklingError, TypeError, AttributeError):
+        # Unwritable directory or unpicklable result (AttributeError: e.g. a local
+        # function); the result is still returned, just not cached
+        if temp_file is not None:
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+
+    return result
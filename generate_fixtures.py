@@ -0,0 +1,158 @@
+import argparse
+import csv
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+import openpyxl
+
+# Written next to the fixtures so benchmark.py can record the scale it ran at
+FIXTURE_INFO_FILE = 'fixture_info.json'
+
+LEAVE_HEADER = ['PID', 'Submission Date', 'Workflow Type', 'Employee Code', 'Employee Name',
+                'Start Date', 'End Date', 'Period', 'Sent To Payroll', 'Status']
+STATUSES = ['Approved', 'Pending', 'Rejected', 'Cancelled']
+STATUS_WEIGHTS = [70, 15, 10, 5]
+FIRST_NAMES = ['Mohamed', 'Ahmed', 'Ali', 'Omar', 'Khalid', 'Yusuf', 'Hassan', 'Ibrahim', 'Saad', 'Fahad']
+LAST_NAMES = ['Al Harbi', 'Al Qahtani', 'Al Ghamdi', 'Al Zahrani', 'Khan', 'Hussain', 'Abdullah', 'Salem']
+
+
+def employee_codes_for(count):
+    """Returns `count` unique numeric employee codes, starting at 60000 like the real roster."""
+    return [str(60000 + i) for i in range(count)]
+
+
+def random_name(rng):
+    """Returns a random employee name; a few contain quotes like real console exports."""
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    if rng.random() < 0.01:
+        name = f'{name} "Abu {rng.choice(FIRST_NAMES)}"'
+    return name
+
+
+def write_employee_csv(path, codes, names):
+    """Writes the roster with the Employee Code in the third column, quoted like the HR export."""
+    with open(path, mode='w', newline='', encoding='utf-8') as emp_file:
+        writer = csv.writer(emp_file, quoting=csv.QUOTE_ALL)
+        writer.writerow(['No', 'Employee Name', 'Employee Code'])
+        for i, code in enumerate(codes, start=1):
+            writer.writerow([i, names[code], code])
+
+
+def leave_rows(rng, code, name, count, year, next_pid):
+    """Returns `count` leave rows for one employee, mostly starting in `year`."""
+    rows = []
+    for _ in range(count):
+        start = datetime(year, 1, 1) + timedelta(days=rng.randint(-60, 425))
+        days = rng.choice([1, 2, 3, 5, 7, 7, 10, 14, 21, 30, 45])
+        end = start + timedelta(days=days - 1)
+        submitted = start - timedelta(days=rng.randint(1, 60))
+        rows.append([
+            str(next_pid + len(rows)),
+            submitted.strftime('%d/%m/%Y'),
+            'Annual Leave',
+            code,
+            name,
+            start.strftime('%d/%m/%Y'),
+            end.strftime('%d/%m/%Y'),
+            str(days),
+            rng.choice(['Yes', 'No']),
+            rng.choices(STATUSES, STATUS_WEIGHTS)[0],
+        ])
+    return rows
+
+
+def write_output_csv(path, rng, codes, names, leaves_per_employee, year):
+    """
+    Writes a '01 vac.js'-style console dump: progress log lines, one block per
+    harvested ID with its own header line, quoted CSV rows, IDs that are not
+    in the roster, repeated blocks and the odd console source prefix.
+
+    Returns:
+        int: Number of leave rows written (repeats included).
+    """
+    harvested = list(codes)
+    harvested += [str(900000 + i) for i in range(max(1, len(codes) // 20))]  # Not in the roster
+    rng.shuffle(harvested)
+
+    next_pid = 600000
+    written = 0
+    with open(path, mode='w', encoding='utf-8') as outfile:
+        for i, code in enumerate(harvested, start=1):
+            rows = leave_rows(rng, code, names.get(code) or random_name(rng),
+                              rng.randint(0, 2 * leaves_per_employee), year, next_pid)
+            next_pid += len(rows)
+
+            # About 2% of IDs were harvested twice, e.g. after a re-run
+            for _ in range(2 if rng.random() < 0.02 else 1):
+                outfile.write(f"Processing ID #{i}: {code}\n")
+                outfile.write(f"Entered ID: {code}\n")
+                outfile.write(f"\n--- Annual Leave Data for ID: {code} ---\n")
+                outfile.write(",".join(LEAVE_HEADER) + "\n")
+                for row in rows:
+                    prefix = f"VM{rng.randint(100, 999)}:102 " if rng.random() < 0.01 else ""
+                    outfile.write(prefix + ",".join('"' + cell.replace('"', '""') + '"' for cell in row) + "\n")
+                    written += 1
+                outfile.write("\n")
+
+        outfile.write("✅ Automation complete!\n")
+
+    return written
+
+
+def write_projects_workbook(path, rng, codes, names, projects):
+    """Writes 'AL HARAM PROJECTS.xlsx': a title row, then a header row and one row per employee."""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Sheet1')
+    sheet.append(['Al Shamiyah Project'])
+    sheet.append(['No', 'Name', 'ID', 'Project', 'Start Date', 'End Date'])
+
+    # Most, but not all, employees are on the sheet, plus a few who left the roster
+    ids = [code for code in codes if rng.random() < 0.95]
+    ids += [str(800000 + i) for i in range(max(1, len(codes) // 100))]
+    for i, code in enumerate(ids, start=1):
+        sheet.append([i, names.get(code, random_name(rng)), int(code), f"Project {rng.randint(1, projects)}", None, None])
+
+    workbook.save(path)
+
+
+def generate(output_dir, employees, leaves_per_employee, year, projects, seed):
+    """Writes employee.csv, output.csv, AL HARAM PROJECTS.xlsx and fixture_info.json into output_dir."""
+    os.makedirs(output_dir, exist_ok=True)
+    rng = random.Random(seed)
+
+    codes = employee_codes_for(employees)
+    names = {code: random_name(rng) for code in codes}
+
+    write_employee_csv(os.path.join(output_dir, 'employee.csv'), codes, names)
+    leave_count = write_output_csv(os.path.join(output_dir, 'output.csv'), rng, codes, names, leaves_per_employee, year)
+    write_projects_workbook(os.path.join(output_dir, 'AL HARAM PROJECTS.xlsx'), rng, codes, names, projects)
+
+    info = {
+        'employees': employees,
+        'leaves_per_employee': leaves_per_employee,
+        'leave_rows': leave_count,
+        'year': year,
+        'projects': projects,
+        'seed': seed,
+    }
+    with open(os.path.join(output_dir, FIXTURE_INFO_FILE), mode='w', encoding='utf-8') as info_file:
+        json.dump(info, info_file, indent=2)
+
+    return info
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic employee.csv, output.csv and AL HARAM PROJECTS.xlsx fixtures.")
+    parser.add_argument('output_dir', help="directory to write the fixtures to")
+    parser.add_argument('--employees', type=int, default=1000, help="roster size, e.g. 1000, 10000 or 100000 (default: 1000)")
+    parser.add_argument('--leaves-per-employee', type=int, default=10,
+                        help="average leave rows per harvested ID (default: 10)")
+    parser.add_argument('--year', type=int, default=2025, help="year most leaves start in (default: 2025)")
+    parser.add_argument('--projects', type=int, default=20, help="number of projects on the workbook (default: 20)")
+    parser.add_argument('--seed', type=int, default=0, help="random seed (default: 0)")
+    args = parser.parse_args()
+
+    info = generate(args.output_dir, args.employees, args.leaves_per_employee, args.year, args.projects, args.seed)
+    print(f"✅ Fixtures written to '{args.output_dir}': {info['employees']} employees, {info['leave_rows']} leave rows.")
@@ -0,0 +1,91 @@
+import csv
+import re
+from collections import namedtuple
+
+# One row of getAnnualLeaveAsCSV() in '01 vac.js', in filtered_output.csv column order
+LeaveRecord = namedtuple('LeaveRecord', [
+    'pid', 'submission_date', 'workflow_type', 'employee_code', 'employee_name',
+    'start_date', 'end_date', 'period', 'sent_to_payroll', 'status',
+])
+
+# runAutomation() prints this line before the CSV of each ID
+BLOCK_HEADER = re.compile(r'--- Annual Leave Data for ID: (\S+) ---')
+
+
+def parse_lines(lines, blocks=None, rejected=None, block_id=None):
+    """
+    Parses the console dump of '01 vac.js' line by line.
+
+    Block headers set the current ID. The CSV header line of each block and
+    log lines ("Processing ID", "Entered ID", ...) have no quotes and are
+    skipped. Data rows are the quoted CSV written by getAnnualLeaveAsCSV();
+    anything copied from the console before the first quote (e.g. a
+    "VM123:45 " source prefix) is ignored.
+
+    Args:
+        lines (iterable): Lines of output.csv.
+        blocks (Counter, optional): If given, every block ID is added to it,
+            including blocks without rows, and counts the rows of its block.
+        rejected (Counter, optional): If given, quoted lines that are not a
+            full leave row (too few fields) are counted in it as 'malformed row'.
+        block_id (str, optional): The block ID in effect before the first line,
+            when parsing starts in the middle of a dump.
+
+    Yields:
+        tuple: (block ID or None before the first block, LeaveRecord).
+    """
+    for line in lines:
+        quote = line.find('"')
+        if quote == -1:
+            match = BLOCK_HEADER.search(line)
+            if match:
+                block_id = match.group(1)
+                if blocks is not None:
+                    blocks[block_id] += 0
+            continue
+
+        # Parse each line on its own so a stray quote cannot swallow the next lines
+        fields = next(csv.reader((line[quote:].rstrip(),)), [])
+        if len(fields) >= len(LeaveRecord._fields):
+            if blocks is not None:
+                blocks[block_id] += 1
+            yield block_id, LeaveRecord._make(fields[:len(LeaveRecord._fields)])
+        elif rejected is not None:
+            rejected['malformed row'] += 1
+
+
+def last_block_id(infile, position, chunk_size=64 * 1024):
+    """
+    Returns the ID of the last block header before `position` in a binary
+    file, or None, reading backwards a chunk at a time.
+    """
+    header = re.compile(BLOCK_HEADER.pattern.encode('ascii'))
+    end = position
+    while end > 0:
+        start = max(0, end - chunk_size)
+        infile.seek(start)
+        # Read a little past `end` so a header cut by the chunk boundary is still found
+        data = infile.read(min(end + 256, position) - start)
+        match = None
+        for match in header.finditer(data):
+            pass
+        if match:
+            return match.group(1).decode('utf-8', errors='ignore')
+        end = start
+    return None
+
+
+def unique_records(records, rejected=None):
+    """
+    Drops records whose PID was already seen, keeping the first one.
+
+    If a Counter is passed as `rejected`, dropped records are counted in it as 'duplicate PID'.
+    """
+    seen_pids = set()
+    for record in records:
+        if record.pid in seen_pids:
+            if rejected is not None:
+                rejected['duplicate PID'] += 1
+            continue
+        seen_pids.add(record.pid)
+        yield record
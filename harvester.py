@@ -0,0 +1,382 @@
+import argparse
+import asyncio
+import os
+import random
+import ssl
+import time
+from html.parser import HTMLParser
+from urllib.parse import quote, urlsplit
+
+from roster import load_employee_codes
+
+CONCURRENCY = 8          # IDs harvested at once, each worker on its own keep-alive connection
+REQUEST_TIMEOUT = 30.0   # Seconds for one request, connect included
+MAX_RETRIES = 3          # Retries per ID after the first attempt
+BACKOFF_BASE = 0.5       # First retry waits about this long; each retry doubles it
+BACKOFF_MAX = 10.0
+
+# Statuses worth retrying; any other non-2xx response fails the ID at once
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+GRID_TABLE_ID = 'wfStatusGrid_DXMainTable'
+HEADER_ROW_PREFIX = 'wfStatusGrid_DXHeadersRow'
+DATA_ROW_PREFIX = 'wfStatusGrid_DXDataRow'
+
+
+class HarvestError(Exception):
+    """An ID could not be harvested; `retry` says whether another attempt may succeed."""
+
+    def __init__(self, message, retry=True):
+        super().__init__(message)
+        self.retry = retry
+
+
+class GridParser(HTMLParser):
+    """
+    Collects the header and data rows of the wfStatusGrid table from a page,
+    as the cell texts '01 vac.js' reads with innerText.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.found_table = False
+        self.header_rows = []
+        self.data_rows = []
+        self.table_depth = 0   # Tables open inside the grid table, the grid itself included
+        self.row = None        # Cells of the grid row being read
+        self.cell = None       # Text parts of the cell being read
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'table':
+            if self.table_depth:
+                self.table_depth += 1
+            elif dict(attrs).get('id') == GRID_TABLE_ID:
+                self.found_table = True
+                self.table_depth = 1
+        elif not self.table_depth:
+            return
+        elif tag == 'tr':
+            row_id = dict(attrs).get('id') or ''
+            if row_id.startswith(HEADER_ROW_PREFIX):
+                self.row = []
+                self.header_rows.append(self.row)
+            elif row_id.startswith(DATA_ROW_PREFIX):
+                self.row = []
+                self.data_rows.append(self.row)
+        elif tag in ('td', 'th') and self.row is not None and self.table_depth == 1:
+            self.cell = []
+            self.row.append(self.cell)
+        elif tag == 'br' and self.cell is not None:
+            self.cell.append(' ')
+
+    def handle_endtag(self, tag):
+        if not self.table_depth:
+            return
+        if tag == 'table':
+            self.table_depth -= 1
+        elif tag == 'tr' and self.table_depth == 1:
+            self.row = None
+            self.cell = None
+        elif tag in ('td', 'th') and self.table_depth == 1:
+            self.cell = None
+
+    def handle_data(self, data):
+        if self.cell is not None:
+            self.cell.append(data)
+
+
+def cell_text(parts):
+    """innerText.trim().replace(/\\s+/g, ' ') of a cell."""
+    return ' '.join(''.join(parts).split())
+
+
+def annual_leave_csv(page, emp_id):
+    """
+    Builds the CSV that getAnnualLeaveAsCSV() in '01 vac.js' builds from the
+    wfStatusGrid table: the unique non-empty header texts, then the quoted
+    cells (without the "Details" column) of every "Annual Leave" row.
+
+    Like gridShowsId() in '01 vac.js', a page whose rows belong to another
+    Employee Code is rejected so that stale or mixed-up responses are retried.
+
+    Raises:
+        HarvestError: The page has no grid table or shows another ID.
+    """
+    parser = GridParser()
+    parser.feed(page)
+    parser.close()
+    if not parser.found_table:
+        raise HarvestError(f"No {GRID_TABLE_ID} table in the response")
+
+    headers = []
+    for row in parser.header_rows:
+        for parts in row:
+            text = cell_text(parts)
+            if text and text not in headers:
+                headers.append(text)
+
+    rows = []
+    for row in parser.data_rows:
+        texts = [cell_text(parts) for parts in row]
+        if len(texts) <= 4 or texts[4] != emp_id:  # Employee Code is the 5th cell
+            raise HarvestError(f"Grid rows do not belong to ID {emp_id}")
+        if texts[3] == "Annual Leave":  # Workflow Type is the 4th cell
+            rows.append(texts[1:])      # Skip the "Details" button cell
+
+    csv_text = ",".join(headers) + "\n"
+    for row in rows:
+        csv_text += ",".join('"' + cell.replace('"', '""') + '"' for cell in row) + "\n"
+    return csv_text
+
+
+class KeepAliveConnection:
+    """
+    One persistent HTTP/1.1 connection, reopened when the server closes it
+    or a request fails. Each harvester worker owns one, so the pool of
+    workers is also the pool of keep-alive connections.
+    """
+
+    def __init__(self, base_url, headers=None, timeout=REQUEST_TIMEOUT):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.https = parts.scheme == 'https'
+        self.port = parts.port or (443 if self.https else 80)
+        self.host_header = parts.netloc
+        self.headers = headers or {}
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (OSError, ssl.SSLError):
+                pass
+        self.reader = self.writer = None
+
+    async def request(self, method, target, body=b''):
+        """Sends one request and returns (status, body bytes)."""
+        try:
+            return await asyncio.wait_for(self._request(method, target, body), self.timeout)
+        except BaseException:
+            await self.close()  # The connection state is unknown; start afresh next time
+            raise
+
+    async def _request(self, method, target, body):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port, ssl=ssl.create_default_context() if self.https else None)
+
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {self.host_header}", "Connection: keep-alive",
+                 f"Content-Length: {len(body)}"]
+        lines += [f"{name}: {value}" for name, value in self.headers.items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Server closed the connection")
+        status = int(status_line.split()[1])
+
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await self.reader.readline()  # Blank line after the last chunk
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readexactly(2)  # CRLF after each chunk
+            content = b''.join(chunks)
+        elif 'content-length' in response_headers:
+            content = await self.reader.readexactly(int(response_headers['content-length']))
+        else:
+            content = await self.reader.read()  # Body ends when the server closes
+            response_headers['connection'] = 'close'
+
+        if response_headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, content
+
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter for retry number `attempt` (1-based)."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1)))
+
+
+async def fetch_leave_csv(connection, url_template, data_template, emp_id, max_retries=MAX_RETRIES):
+    """
+    Fetches the grid page of one ID and returns its Annual Leave CSV,
+    retrying with backoff on connection errors, timeouts, retryable
+    statuses and pages that do not show the ID.
+
+    Raises:
+        HarvestError: The ID failed after all retries, or failed permanently.
+    """
+    parts = urlsplit(url_template.replace('{id}', quote(emp_id)))
+    target = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+    body = data_template.replace('{id}', quote(emp_id)).encode('utf-8') if data_template else b''
+    method = 'POST' if data_template else 'GET'
+
+    for attempt in range(max_retries + 1):
+        if attempt:
+            await asyncio.sleep(backoff_delay(attempt))
+        try:
+            status, content = await connection.request(method, target, body)
+            if status in RETRY_STATUSES:
+                raise HarvestError(f"HTTP {status}")
+            if not 200 <= status < 300:
+                raise HarvestError(f"HTTP {status}", retry=False)
+            return annual_leave_csv(content.decode('utf-8', errors='replace'), emp_id)
+        except HarvestError as e:
+            error = e
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+            error = HarvestError(f"{type(e).__name__}: {e}")
+
+        if not error.retry:
+            break
+        if attempt < max_retries:
+            print(f"⚠️ ID {emp_id}: {error}, retrying ({attempt + 1}/{max_retries})")
+
+    raise error
+
+
+def checkpoint_path_for(output_file):
+    """Returns the checkpoint file kept next to the output file."""
+    return f"{output_file}.checkpoint"
+
+
+def load_checkpoint(checkpoint_file):
+    """Returns the IDs already written to the output file by earlier runs."""
+    if not os.path.exists(checkpoint_file):
+        return set()
+    with open(checkpoint_file, mode='r', encoding='utf-8') as checkpoint:
+        return {line.strip() for line in checkpoint if line.strip()}
+
+
+async def harvest(ids, url_template, output_file='output.csv', data_template=None, headers=None,
+                  concurrency=CONCURRENCY, max_retries=MAX_RETRIES, restart=False):
+    """
+    Harvests the Annual Leave CSV of every ID and streams it into output_file
+    in the console format of '01 vac.js', which '02 filter.py' reads.
+
+    Each ID's block is written and flushed as soon as it arrives (blocks are in
+    completion order) and its ID is then appended to the checkpoint file, so an
+    interrupted run resumes with the IDs not yet written. An ID written but not
+    yet checkpointed when a run stops is harvested again; '02 filter.py' drops
+    the repeated PIDs.
+
+    Args:
+        ids (list): Employee IDs, in the order to start them.
+        url_template (str): Grid URL with '{id}' where the ID goes.
+        output_file (str): The console-format output, appended to when resuming from
+            its checkpoint and overwritten otherwise.
+        data_template (str, optional): Form body with '{id}'; the request is then a POST.
+        headers (dict, optional): Extra request headers, e.g. the session Cookie.
+        concurrency (int): Number of workers, each with its own keep-alive connection.
+        max_retries (int): Retries per ID.
+        restart (bool): Ignore and clear an existing checkpoint and output.
+
+    Returns:
+        tuple: (IDs harvested this run, dict of failed ID -> error message).
+    """
+    checkpoint_file = checkpoint_path_for(output_file)
+    # Only a checkpoint proves output_file came from an earlier run of this harvest;
+    # without one, an existing output_file is stale and is overwritten
+    resume = not restart and os.path.exists(checkpoint_file)
+    done = load_checkpoint(checkpoint_file) if resume else set()
+    pending = [emp_id for emp_id in dict.fromkeys(ids) if emp_id not in done]
+    print(f"Harvesting {len(pending)} IDs ({len(done)} already done) with {concurrency} workers.")
+
+    queue = asyncio.Queue()
+    for number, emp_id in enumerate(pending, start=len(done) + 1):
+        queue.put_nowait((number, emp_id))
+
+    harvested = []
+    failed = {}
+    started = time.perf_counter()
+    file_mode = 'a' if resume else 'w'
+
+    with open(output_file, mode=file_mode, encoding='utf-8') as outfile, \
+         open(checkpoint_file, mode=file_mode, encoding='utf-8') as checkpoint:
+
+        async def worker():
+            connection = KeepAliveConnection(url_template, headers)
+            try:
+                while True:
+                    try:
+                        number, emp_id = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    try:
+                        csv_text = await fetch_leave_csv(connection, url_template, data_template, emp_id, max_retries)
+                    except HarvestError as e:
+                        print(f"❌ Giving up on ID {emp_id}: {e}")
+                        failed[emp_id] = str(e)
+                        continue
+
+                    # One write per block, so blocks of concurrent workers never interleave
+                    outfile.write(f"Processing ID #{number}: {emp_id}\n"
+                                  f"\n--- Annual Leave Data for ID: {emp_id} ---\n{csv_text}\n")
+                    outfile.flush()
+                    checkpoint.write(emp_id + "\n")
+                    checkpoint.flush()
+                    harvested.append(emp_id)
+                    if len(harvested) % 100 == 0:
+                        print(f"... {len(harvested)} of {len(pending)} IDs harvested")
+            finally:
+                await connection.close()
+
+        await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(pending))))))
+
+        if not failed:
+            outfile.write("✅ Automation complete!\n")
+
+    print(f"\n✅ Harvested {len(harvested)} IDs in {time.perf_counter() - started:.1f}s into '{output_file}'.")
+    if failed:
+        print(f"❌ {len(failed)} IDs failed; run again to retry them (done IDs are kept in '{checkpoint_file}').")
+    return harvested, failed
+
+
+def parse_header(text):
+    """Splits a 'Name: value' command-line header."""
+    name, separator, value = text.partition(':')
+    if not separator:
+        raise argparse.ArgumentTypeError(f"Expected 'Name: value', got '{text}'")
+    return name.strip(), value.strip()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Harvest Annual Leave grids for many IDs concurrently into output.csv "
+                                                 "(the format of the '01 vac.js' console output).")
+    parser.add_argument('url', help="grid URL with {id} where the employee ID goes, "
+                                    "e.g. 'https://hr.example/WF/Status.aspx?emp={id}'")
+    parser.add_argument('--data', metavar='TEMPLATE', help="POST this form body (with {id}) instead of a GET")
+    parser.add_argument('--header', action='append', type=parse_header, default=[], metavar="'NAME: VALUE'",
+                        help="extra request header, e.g. the session 'Cookie: ...' (repeatable)")
+    parser.add_argument('--ids', metavar='FILE', help="file with one ID per line (default: every code in employee.csv)")
+    parser.add_argument('--output', default='output.csv', help="output file (default: output.csv)")
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY,
+                        help=f"IDs harvested at once (default: {CONCURRENCY})")
+    parser.add_argument('--retries', type=int, default=MAX_RETRIES, help=f"retries per ID (default: {MAX_RETRIES})")
+    parser.add_argument('--restart', action='store_true', help="ignore the checkpoint and start a new output file")
+    args = parser.parse_args()
+
+    if args.ids:
+        with open(args.ids, mode='r', encoding='utf-8') as ids_file:
+            ids = [line.strip() for line in ids_file if line.strip()]
+    else:
+        ids = sorted(load_employee_codes('employee.csv'))
+
+    asyncio.run(harvest(ids, args.url, args.output, args.data, dict(args.header),
+                        args.concurrency, args.retries, args.restart))
@@ -0,0 +1,141 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from functools import lru_cache
+
+# Day numbers (date ordinals) stay below this, so employee * DAY_SPAN + day sorts by employee, then day
+DAY_SPAN = 1 << 22
+
+
+@lru_cache(maxsize=None)
+def day_number(text):
+    """Returns the day number (date ordinal) of a 'DD/MM/YYYY' date; each distinct string is parsed once."""
+    return datetime.strptime(text, "%d/%m/%Y").toordinal()
+
+
+@lru_cache(maxsize=None)
+def day_text(day):
+    """Formats a day number back as 'DD/MM/YYYY'."""
+    return date.fromordinal(day).strftime("%d/%m/%Y")
+
+
+class LeaveColumns:
+    """
+    Approved leaves stored as parallel arrays instead of one dict per leave.
+
+    Leaves are sorted by employee, then Start Date, so the leaves of employee
+    `i` are the contiguous slice offsets[i]:offsets[i + 1] of every column.
+    Dates are day numbers (date ordinals). Per slice it also keeps the running
+    maximum of the End Dates (for binary search on window start) and the
+    leaves merged into non-overlapping intervals.
+
+    Usage:
+        leave_columns = LeaveColumns.from_rows(rows)
+        emp = leave_columns.employee('600123')
+        for k in leave_columns.overlapping(emp, window_start.toordinal(), window_end.toordinal()):
+            print(leave_columns.pids[k], day_text(leave_columns.starts[k]))
+    """
+
+    def __init__(self, codes, offsets, pids, starts, ends, positions, max_ends,
+                 merged_offsets, merged_starts, merged_ends):
+        self.codes = codes  # Employee index -> Employee Code, in first-seen order
+        self.code_index = {code: i for i, code in enumerate(codes)}
+        self.offsets = offsets
+        self.pids = pids
+        self.starts = starts
+        self.ends = ends
+        self.positions = positions  # Input position of each leave, to report leaves in input order
+        self.max_ends = max_ends
+        self.merged_offsets = merged_offsets
+        self.merged_starts = merged_starts
+        self.merged_ends = merged_ends
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Builds the columns from approved rows.
+
+        Args:
+            rows (iterable): Rows in filtered_output.csv column order, without header.
+        """
+        code_index = {}
+        employees = array('l')
+        pids = []
+        starts = array('l')
+        ends = array('l')
+
+        for row in rows:
+            employees.append(code_index.setdefault(row[3], len(code_index)))
+            pids.append(row[0])
+            starts.append(day_number(row[5]))
+            ends.append(day_number(row[6]))
+
+        # Stable sort, so leaves with the same Start Date keep their input order
+        order = sorted(range(len(pids)), key=lambda i: employees[i] * DAY_SPAN + starts[i])
+
+        offsets = array('l', [0] * (len(code_index) + 1))
+        for emp in employees:
+            offsets[emp + 1] += 1
+        for emp in range(len(code_index)):
+            offsets[emp + 1] += offsets[emp]
+
+        sorted_starts = array('l', (starts[i] for i in order))
+        sorted_ends = array('l', (ends[i] for i in order))
+
+        max_ends = array('l')
+        merged_offsets = array('l', [0])
+        merged_starts = array('l')
+        merged_ends = array('l')
+        for emp in range(len(code_index)):
+            running_max = None
+            for k in range(offsets[emp], offsets[emp + 1]):
+                start, end = sorted_starts[k], sorted_ends[k]
+                running_max = end if running_max is None or end > running_max else running_max
+                max_ends.append(running_max)
+
+                # Overlapping leaves merge into one interval, as in leave_intervals.merge_leaves
+                if len(merged_starts) > merged_offsets[-1] and start <= merged_ends[-1]:
+                    merged_ends[-1] = max(merged_ends[-1], end)
+                else:
+                    merged_starts.append(start)
+                    merged_ends.append(end)
+            merged_offsets.append(len(merged_starts))
+
+        return cls(
+            list(code_index), offsets, [pids[i] for i in order], sorted_starts, sorted_ends,
+            array('l', order), max_ends, merged_offsets, merged_starts, merged_ends,
+        )
+
+    def __len__(self):
+        """Number of employees with leaves."""
+        return len(self.codes)
+
+    @property
+    def record_count(self):
+        """Number of leaves."""
+        return len(self.pids)
+
+    def employee(self, emp_code):
+        """Returns the employee index of an Employee Code, or None if it has no leaves."""
+        return self.code_index.get(emp_code)
+
+    def leave_count(self, emp):
+        """Returns the number of leaves of employee index `emp`."""
+        return self.offsets[emp + 1] - self.offsets[emp]
+
+    def overlapping(self, emp, window_start, window_end):
+        """Returns the column indexes of the leaves of `emp` that overlap the window (day numbers), in input order."""
+        lo, hi = self.offsets[emp], self.offsets[emp + 1]
+        # Leaves before `first` all end before the window; leaves from `last` on start after it
+        first = bisect_left(self.max_ends, window_start, lo, hi)
+        last = bisect_right(self.starts, window_end, lo, hi)
+        ends = self.ends
+        overlapping = [k for k in range(first, last) if ends[k] >= window_start]
+        overlapping.sort(key=self.positions.__getitem__)
+        return overlapping
+
+    def is_fully_covered(self, emp, window_start, window_end):
+        """Returns True if a single merged interval of `emp` spans the whole window (day numbers)."""
+        lo = self.merged_offsets[emp]
+        position = bisect_right(self.merged_starts, window_start, lo, self.merged_offsets[emp + 1]) - 1
+        return position >= lo and self.merged_ends[position] >= window_end
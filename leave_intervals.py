@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+ONE_DAY = timedelta(days=1)
+
+
+def merge_leaves(leaves):
+    """
+    Merges overlapping leave records into non-overlapping intervals.
+
+    Args:
+        leaves (list): Dicts with 'PID', 'Start Date' and 'End Date' keys.
+
+    Returns:
+        list: Merged dicts sorted by 'Start Date'. The 'PID' of a merged
+        interval lists every PID it was built from.
+    """
+    merged_dates = []
+    sorted_leaves = sorted(leaves, key=lambda x: x["Start Date"])
+
+    for interval in sorted_leaves:
+        if not merged_dates:
+            merged_dates.append(interval)
+        else:
+            last = merged_dates[-1]
+            if interval["Start Date"] <= last["End Date"]:
+                # Overlap, merge
+                new_start = last["Start Date"]
+                new_end = max(last["End Date"], interval["End Date"])
+                merged_dates[-1] = {
+                    "Start Date": new_start,
+                    "End Date": new_end,
+                    "PID": f"{last['PID']}, {interval['PID']}",
+                }
+            else:
+                merged_dates.append(interval)
+
+    return merged_dates
+
+
+def uncovered_segments(window_start, window_end, leaves):
+    """
+    Subtracts leave records from a window of whole days.
+
+    Args:
+        window_start (datetime): First day of the window.
+        window_end (datetime): Last day of the window (inclusive).
+        leaves (list): Dicts with 'PID', 'Start Date' and 'End Date' keys.
+            Leaves that end before they start are ignored.
+
+    Returns:
+        list: (start, end) tuples, inclusive and in date order, for every
+        block of days in the window not covered by any leave.
+    """
+    segments = []
+    next_uncovered = window_start
+
+    valid_leaves = [leave for leave in leaves if leave["Start Date"] <= leave["End Date"]]
+    for merged in merge_leaves(valid_leaves):
+        if merged["End Date"] < next_uncovered:
+            continue
+        if merged["Start Date"] > window_end:
+            break
+        if merged["Start Date"] > next_uncovered:
+            segments.append((next_uncovered, merged["Start Date"] - ONE_DAY))
+        next_uncovered = merged["End Date"] + ONE_DAY
+
+    if next_uncovered <= window_end:
+        segments.append((next_uncovered, window_end))
+
+    return segments
@@ -0,0 +1,233 @@
+import argparse
+import csv
+import sys
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from leave_columns import LeaveColumns
+from pipeline import leaveadjust_stage
+from roster import load_employee_codes
+
+NO_PROJECT = '(no project)'
+
+
+class LeaveOccupancy:
+    """
+    Employee x day matrix of who is on approved leave, for company-wide
+    planning queries.
+
+    matrix[i, d] is True when employee_codes[i] is on leave on day
+    first_day + d (day numbers are date ordinals, as in leave_columns.py).
+    Every query is a NumPy reduction over the matrix, so there are no
+    per-day or per-employee Python loops.
+
+    Coverage here is counted in days: back-to-back leaves (1-14 and 15-20
+    June) fully cover 14-20 June, whereas '06 analyze.py' needs a single
+    merged leave spanning the window.
+    """
+
+    def __init__(self, employee_codes, first_day, matrix):
+        """
+        Args:
+            employee_codes (list): Employee Code of each matrix row.
+            first_day (int): Day number of the first matrix column.
+            matrix (np.ndarray): Boolean array of shape (employees, days).
+        """
+        self.employee_codes = employee_codes
+        self.first_day = first_day
+        self.matrix = matrix
+
+    @classmethod
+    def from_columns(cls, leave_columns, employee_codes, first_day, last_day):
+        """
+        Builds the matrix from a LeaveColumns for the days first_day..last_day.
+
+        Leaves of employees not in employee_codes and leaves that end before
+        they start are ignored; leaves are clipped to the date range.
+
+        Args:
+            leave_columns (LeaveColumns): Approved leaves (see leave_columns.py).
+            employee_codes (iterable): The roster; one matrix row per code, sorted.
+            first_day (int): Day number of the first day (e.g. 1 January).
+            last_day (int): Day number of the last day, inclusive.
+        """
+        codes = sorted(employee_codes)
+        row_of = {code: row for row, code in enumerate(codes)}
+        day_count = last_day - first_day + 1
+
+        # Matrix row of every leave: each LeaveColumns employee's row, repeated over its slice
+        employee_rows = np.array([row_of.get(code, -1) for code in leave_columns.codes], dtype=np.int64)
+        rows = np.repeat(employee_rows, np.diff(np.asarray(leave_columns.offsets)))
+        starts = np.asarray(leave_columns.starts) - first_day
+        ends = np.asarray(leave_columns.ends) - first_day
+
+        keep = (rows >= 0) & (starts <= ends) & (ends >= 0) & (starts < day_count)
+        rows = rows[keep]
+        starts = np.clip(starts[keep], 0, day_count - 1)
+        ends = np.clip(ends[keep], 0, day_count - 1)
+
+        # +1 on each leave's first day and -1 after its last; a running sum per row
+        # then counts the leaves covering each day
+        changes = np.zeros((len(codes), day_count + 1), dtype=np.int16)
+        np.add.at(changes, (rows, starts), 1)
+        np.add.at(changes, (rows, ends + 1), -1)
+        matrix = np.cumsum(changes, axis=1, dtype=np.int16)[:, :day_count] > 0
+
+        return cls(codes, first_day, matrix)
+
+    @classmethod
+    def for_year(cls, leave_columns, employee_codes, year):
+        """Builds the matrix for 1 January to 31 December of `year`."""
+        return cls.from_columns(leave_columns, employee_codes,
+                                date(year, 1, 1).toordinal(), date(year, 12, 31).toordinal())
+
+    @property
+    def dates(self):
+        """The date of each matrix column."""
+        return pd.date_range(date.fromordinal(self.first_day), periods=self.matrix.shape[1], freq='D')
+
+    def headcount(self):
+        """Returns the number of employees on leave on each day."""
+        return self.matrix.sum(axis=0)
+
+    def peak_days(self, top=10):
+        """Returns the `top` days with the most employees on leave as (date, count) pairs, busiest first."""
+        headcount = self.headcount()
+        days = np.argsort(-headcount, kind='stable')[:top]
+        dates = self.dates
+        return [(dates[day].date(), int(headcount[day])) for day in days]
+
+    def window_coverage(self, window_start, window_end):
+        """
+        Returns the leave days and coverage status of every employee for a window.
+
+        Args:
+            window_start (datetime): First day of the window.
+            window_end (datetime): Last day of the window (inclusive); the
+                window must lie within the matrix's date range.
+
+        Returns:
+            tuple: (days on leave per employee, status per employee:
+            'fully covered', 'partially covered' or 'no leave').
+        """
+        first = window_start.toordinal() - self.first_day
+        last = window_end.toordinal() - self.first_day
+        if first < 0 or last >= self.matrix.shape[1] or first > last:
+            raise ValueError(f"Window {window_start:%d/%m/%Y}-{window_end:%d/%m/%Y} is outside the matrix dates.")
+
+        days_on_leave = self.matrix[:, first:last + 1].sum(axis=1)
+        status = np.select(
+            [days_on_leave == last - first + 1, days_on_leave > 0],
+            ['fully covered', 'partially covered'],
+            default='no leave',
+        )
+        return days_on_leave, status
+
+    def headcount_by_group(self, groups):
+        """
+        Returns the number of employees on leave per day for each group.
+
+        Args:
+            groups (sequence): Group label (e.g. project) of each matrix row.
+
+        Returns:
+            pd.DataFrame: One row per date and one column per group.
+        """
+        by_group = pd.DataFrame(self.matrix).groupby(np.asarray(groups)).sum()
+        by_group = by_group.T
+        by_group.index = self.dates
+        return by_group
+
+
+def load_projects(excel_file):
+    """
+    Reads the Employee ID -> Project mapping from the first sheet of the
+    project workbook, whose header row is detected like '07 leaveadjust.py' does.
+
+    Returns:
+        dict: Employee Code -> Project, or None if the workbook could not be
+        read or has no 'ID' or 'Project' column.
+    """
+    try:
+        header_row = next(iter(leaveadjust_stage.sheet_header_rows(excel_file).values()))
+        df_excel = pd.read_excel(excel_file, header=header_row - 1)
+    except FileNotFoundError:
+        print(f"Error: Excel file '{excel_file}' not found. Please ensure it's in the correct directory.")
+        return None
+    except Exception as e:
+        print(f"Error loading Excel file '{excel_file}': {e}")
+        return None
+    df_excel.columns = df_excel.columns.astype(str).str.strip()
+
+    missing = [column for column in ('ID', 'Project') if column not in df_excel.columns]
+    if missing:
+        print(f"Error: {', '.join(repr(column) for column in missing)} column not found in Excel sheet. "
+              f"Available columns: {df_excel.columns.tolist()}")
+        return None
+
+    ids = pd.to_numeric(df_excel['ID'], errors='coerce')
+    has_id = ids.notna()
+    return dict(zip(ids[has_id].astype('int64').astype(str), df_excel['Project'][has_id].astype(str)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Daily leave headcounts, peak days and window coverage for a whole year.")
+    parser.add_argument('--year', type=int, default=datetime.now().year, help="year to build (default: current year)")
+    parser.add_argument('--approved', default='approved_2025_output.csv',
+                        help="approved leaves from '04 approved.py' (default: approved_2025_output.csv)")
+    parser.add_argument('--top', type=int, default=10, help="number of peak-absence days to print (default: 10)")
+    parser.add_argument('--by-project', metavar='EXCEL',
+                        help="also count leave per day for each project of this workbook, e.g. 'AL HARAM PROJECTS.xlsx'")
+    parser.add_argument('--window', nargs=2, metavar=('START', 'END'),
+                        help="write every employee's coverage of this DD/MM/YYYY DD/MM/YYYY window")
+    args = parser.parse_args()
+
+    if args.window:
+        try:
+            window_start, window_end = (datetime.strptime(text, '%d/%m/%Y') for text in args.window)
+        except ValueError:
+            print(f"Error: --window dates must be given as DD/MM/YYYY, got '{args.window[0]}' '{args.window[1]}'.")
+            sys.exit(1)
+
+    employee_codes = load_employee_codes('employee.csv')
+    with open(args.approved, mode='r', encoding='utf-8') as approved_file:
+        reader = csv.reader(approved_file)
+        next(reader, None)  # Skip header
+        leave_columns = LeaveColumns.from_rows(reader)
+
+    occupancy = LeaveOccupancy.for_year(leave_columns, employee_codes, args.year)
+    print(f"Built leave occupancy for {len(occupancy.employee_codes)} employees x {occupancy.matrix.shape[1]} days.")
+
+    headcount_file = f"leave_headcount_{args.year}.csv"
+    daily = pd.DataFrame({'On Leave': occupancy.headcount()}, index=occupancy.dates)
+
+    if args.by_project:
+        projects = load_projects(args.by_project)
+        if projects is None:
+            sys.exit(1)
+        groups = [projects.get(code, NO_PROJECT) for code in occupancy.employee_codes]
+        daily = daily.join(occupancy.headcount_by_group(groups))
+
+    daily.index.name = 'Date'
+    daily.to_csv(headcount_file, date_format='%d/%m/%Y')
+    print(f"✅ Daily headcount saved to '{headcount_file}'")
+
+    print(f"\n📈 Top {args.top} days by employees on leave:")
+    for day, count in occupancy.peak_days(args.top):
+        print(f"- {day:%d/%m/%Y}: {count}")
+
+    if args.window:
+        try:
+            days_on_leave, status = occupancy.window_coverage(window_start, window_end)
+        except ValueError as e:
+            print(f"\nError: {e} Pick a window within {args.year} (see --year).")
+            sys.exit(1)
+        coverage_file = f"leave_coverage_{window_start:%Y%m%d}_{window_end:%Y%m%d}.csv"
+        pd.DataFrame({
+            'Employee Code': occupancy.employee_codes,
+            'Days On Leave': days_on_leave,
+            'Status': status,
+        }).to_csv(coverage_file, index=False)
+        print(f"\n✅ Coverage of {args.window[0]} - {args.window[1]} saved to '{coverage_file}'")
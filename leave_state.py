@@ -0,0 +1,167 @@
+import csv
+import hashlib
+import json
+import sqlite3
+
+STATE_DB = 'leave_state.sqlite'
+
+# SQLite limits the number of "?" parameters in one statement
+QUERY_CHUNK_SIZE = 500
+
+
+def open_store(db_path=STATE_DB):
+    """Opens (and creates if needed) the incremental state store."""
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS records (
+            stage TEXT NOT NULL,
+            pid TEXT NOT NULL,
+            employee_code TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            row TEXT NOT NULL,
+            PRIMARY KEY (stage, pid)
+        );
+        CREATE INDEX IF NOT EXISTS records_employee ON records (stage, employee_code);
+        CREATE TABLE IF NOT EXISTS employee_versions (
+            stage TEXT NOT NULL,
+            employee_code TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            PRIMARY KEY (stage, employee_code)
+        );
+        CREATE TABLE IF NOT EXISTS coverage (
+            window_key TEXT NOT NULL,
+            employee_code TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            rows TEXT NOT NULL,
+            PRIMARY KEY (window_key, employee_code)
+        );
+    """)
+    return conn
+
+
+def content_hash(row):
+    """Returns a stable hash of a record's fields."""
+    return hashlib.sha1("\x1f".join(row).encode('utf-8')).hexdigest()
+
+
+def sync_stage(conn, stage, rows):
+    """
+    Upserts a full snapshot of one stage's rows, keyed by PID (column 0).
+
+    Records whose content hash is unchanged are not rewritten. Records missing
+    from the snapshot are deleted. Every employee with a new, changed or
+    deleted record gets its version for the stage bumped.
+
+    Args:
+        conn (sqlite3.Connection): Store from open_store().
+        stage (str): Stage name, e.g. 'filtered' or 'approved'.
+        rows (iterable): Rows in filtered_output.csv column order, without header.
+
+    Returns:
+        tuple: (number of new or changed records, number of deleted records).
+    """
+    existing = {
+        pid: (employee_code, row_hash)
+        for pid, employee_code, row_hash in conn.execute(
+            "SELECT pid, employee_code, content_hash FROM records WHERE stage = ?", (stage,))
+    }
+    seen = set()
+    upserts = []
+    changed_employees = set()
+
+    for row in rows:
+        pid = row[0]
+        employee_code = row[3]
+        row_hash = content_hash(row)
+        seen.add(pid)
+
+        previous = existing.get(pid)
+        if previous and previous[1] == row_hash:
+            continue
+        if previous:
+            changed_employees.add(previous[0])
+        changed_employees.add(employee_code)
+        upserts.append((stage, pid, employee_code, row_hash, json.dumps(row)))
+
+    removed = [(stage, pid) for pid in existing if pid not in seen]
+    changed_employees.update(existing[pid][0] for _, pid in removed)
+
+    with conn:
+        conn.executemany("""
+            INSERT INTO records (stage, pid, employee_code, content_hash, row) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (stage, pid) DO UPDATE SET
+                employee_code = excluded.employee_code,
+                content_hash = excluded.content_hash,
+                row = excluded.row
+        """, upserts)
+        conn.executemany("DELETE FROM records WHERE stage = ? AND pid = ?", removed)
+        conn.executemany("""
+            INSERT INTO employee_versions (stage, employee_code, version) VALUES (?, ?, 1)
+            ON CONFLICT (stage, employee_code) DO UPDATE SET version = version + 1
+        """, [(stage, employee_code) for employee_code in changed_employees])
+
+    return len(upserts), len(removed)
+
+
+def sync_stage_file(stage, csv_file, db_path=STATE_DB):
+    """Runs sync_stage on a stage's output CSV (header skipped). Returns (changed, deleted)."""
+    conn = open_store(db_path)
+    try:
+        with open(csv_file, mode='r', newline='', encoding='utf-8') as infile:
+            reader = csv.reader(infile)
+            next(reader, None)  # Skip header
+            return sync_stage(conn, stage, reader)
+    finally:
+        conn.close()
+
+
+def employee_versions(conn, stage):
+    """Returns Employee Code -> current version for one stage."""
+    return dict(conn.execute(
+        "SELECT employee_code, version FROM employee_versions WHERE stage = ?", (stage,)))
+
+
+def stage_record_count(conn, stage):
+    """Returns the number of records stored for one stage."""
+    return conn.execute("SELECT COUNT(*) FROM records WHERE stage = ?", (stage,)).fetchone()[0]
+
+
+def stage_employee_counts(conn, stage):
+    """Returns Employee Code -> number of records stored for one stage."""
+    return dict(conn.execute(
+        "SELECT employee_code, COUNT(*) FROM records WHERE stage = ? GROUP BY employee_code", (stage,)))
+
+
+def stage_rows(conn, stage, employee_codes):
+    """Yields the stored rows of one stage for the given employees."""
+    employee_codes = list(employee_codes)
+    for i in range(0, len(employee_codes), QUERY_CHUNK_SIZE):
+        chunk = employee_codes[i:i + QUERY_CHUNK_SIZE]
+        placeholders = ", ".join("?" * len(chunk))
+        for (row,) in conn.execute(
+                f"SELECT row FROM records WHERE stage = ? AND employee_code IN ({placeholders}) ORDER BY rowid",
+                [stage] + chunk):
+            yield json.loads(row)
+
+
+def cached_coverage(conn, window_key):
+    """Returns Employee Code -> (version, report rows) cached for one window key."""
+    return {
+        employee_code: (version, json.loads(rows))
+        for employee_code, version, rows in conn.execute(
+            "SELECT employee_code, version, rows FROM coverage WHERE window_key = ?", (window_key,))
+    }
+
+
+def save_coverage(conn, window_key, coverage):
+    """Stores Employee Code -> (version, report rows) for one window key."""
+    with conn:
+        conn.executemany("""
+            INSERT INTO coverage (window_key, employee_code, version, rows) VALUES (?, ?, ?, ?)
+            ON CONFLICT (window_key, employee_code) DO UPDATE SET
+                version = excluded.version,
+                rows = excluded.rows
+        """, [
+            (window_key, employee_code, version, json.dumps(rows))
+            for employee_code, (version, rows) in coverage.items()
+        ])
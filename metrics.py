@@ -0,0 +1,138 @@
+import cProfile
+import json
+import os
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak memory is then not recorded
+    resource = None
+
+METRICS_FILE = 'pipeline_metrics.jsonl'
+
+
+def peak_rss_kb():
+    """Returns this process's peak resident set size in KB, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak  # macOS reports bytes
+
+
+class StageMetrics:
+    """
+    Collects timings, row counts and rejections for one run of a stage and
+    appends them as one JSON line to a metrics file.
+
+    Usage:
+        metrics = StageMetrics('02 filter')
+        with metrics.phase('load'):
+            ...
+        metrics.rows_in += 1
+        metrics.reject('not in roster')
+        metrics.write()
+    """
+
+    def __init__(self, stage, metrics_file=METRICS_FILE, profile_file=None, profile_phase=None):
+        """
+        Args:
+            stage (str): Stage name written with every record, e.g. '02 filter'.
+            metrics_file (str, optional): JSON-lines file the record is appended
+                to; if None, write() only returns it (e.g. for a --profile-only run).
+            profile_file (str, optional): If given, the phase named profile_phase
+                runs under cProfile and its stats are dumped here.
+            profile_phase (str, optional): The hot-path phase to profile.
+        """
+        self.stage = stage
+        self.metrics_file = metrics_file
+        self.profile_file = profile_file
+        self.profile_phase = profile_phase
+        self.profiler = None
+        self.started = datetime.now()
+        self.phases = {}
+        self.rows_in = 0
+        self.rows_out = 0
+        self.rejected = Counter()
+
+    @contextmanager
+    def phase(self, name):
+        """Times a block (wall and CPU); repeated phases add up, in the profile too."""
+        profiler = None
+        if self.profile_file and name == self.profile_phase:
+            if self.profiler is None:
+                self.profiler = cProfile.Profile()
+            profiler = self.profiler
+            profiler.enable()
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            cpu_seconds = time.process_time() - cpu_start
+            wall_seconds = time.perf_counter() - wall_start
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(self.profile_file)
+
+            totals = self.phases.setdefault(name, {'wall_seconds': 0.0, 'cpu_seconds': 0.0})
+            totals['wall_seconds'] += wall_seconds
+            totals['cpu_seconds'] += cpu_seconds
+
+    def reject(self, reason, count=1):
+        """Counts rows dropped for a reason."""
+        self.rejected[reason] += count
+
+    def write(self):
+        """Appends this run's record to the metrics file, if there is one, and returns it."""
+        record = {
+            'stage': self.stage,
+            'started': self.started.isoformat(timespec='seconds'),
+            'pid': os.getpid(),
+            'phases': {
+                name: {key: round(value, 4) for key, value in totals.items()}
+                for name, totals in self.phases.items()
+            },
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'rejected': dict(self.rejected),
+            'peak_rss_kb': peak_rss_kb(),
+        }
+        if self.metrics_file:
+            with open(self.metrics_file, mode='a', encoding='utf-8') as metrics_file:
+                metrics_file.write(json.dumps(record) + '\n')
+        return record
+
+
+def add_metrics_arguments(parser):
+    """Adds the shared --metrics / --profile options to a stage's argument parser."""
+    parser.add_argument('--metrics', nargs='?', const=METRICS_FILE, metavar='FILE',
+                        help=f"append per-phase timings, row counts and peak memory to a JSON-lines file "
+                             f"(default: {METRICS_FILE})")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="dump a cProfile of the stage's hot path to FILE (view with python -m pstats FILE)")
+
+
+def metrics_from_args(stage, args, profile_phase):
+    """
+    Returns a StageMetrics when --metrics or --profile was given, else None.
+    With only --profile, nothing is appended to a metrics file.
+    """
+    if not args.metrics and not args.profile:
+        return None
+    return StageMetrics(stage, metrics_file=args.metrics,
+                        profile_file=args.profile, profile_phase=profile_phase)
+
+
+@contextmanager
+def optional_phase(metrics, name):
+    """metrics.phase(name) when metrics is enabled, otherwise a no-op."""
+    if metrics is None:
+        yield
+    else:
+        with metrics.phase(name):
+            yield
@@ -0,0 +1,126 @@
+import argparse
+import random
+import threading
+import time
+from collections import Counter
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from harvest_parser import parse_lines, unique_records
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8766
+
+# Column titles of the grid after its "Details" button column, as '01 vac.js' reads them
+GRID_HEADERS = ['PID', 'Submission Date', 'Workflow Type', 'Employee Code', 'Employee Name',
+                'Start Date', 'End Date', 'Period', 'Sent To Payroll', 'Status']
+
+
+def load_grid_rows(output_file):
+    """Returns {ID: [LeaveRecord, ...]} for every block of a '01 vac.js'-format dump, dropping repeated PIDs."""
+    blocks = Counter()
+    records = []
+    first_block = {}  # PID -> the block it first appears in
+    with open(output_file, mode='r', encoding='utf-8', errors='ignore') as infile:
+        for block_id, record in parse_lines(infile, blocks):
+            first_block.setdefault(record.pid, block_id)
+            records.append(record)
+
+    grid_rows = {}
+    for record in unique_records(records):
+        grid_rows.setdefault(first_block[record.pid], []).append(record)
+    return {block_id: grid_rows.get(block_id, []) for block_id in blocks}
+
+
+def render_grid(records):
+    """Renders a DevExpress-like wfStatusGrid table; a 'Sick Leave' row is added so filtering is exercised."""
+    parts = ['<html><body><div id="wfStatusGrid"><table id="wfStatusGrid_DXMainTable">',
+             '<tr id="wfStatusGrid_DXHeadersRow0"><th></th>']
+    parts += [f"<th><span>{escape(title)}</span></th>" for title in GRID_HEADERS]
+    parts.append('</tr>')
+
+    rows = list(records)
+    if rows:
+        rows.append(rows[0]._replace(pid=rows[0].pid + '9', workflow_type='Sick Leave'))
+    for i, record in enumerate(rows):
+        parts.append(f'<tr id="wfStatusGrid_DXDataRow{i}"><td><a class="dxbButton">Details</a></td>')
+        parts += [f"<td>{escape(value)}</td>" for value in record]
+        parts.append('</tr>')
+    if not rows:
+        parts.append('<tr id="wfStatusGrid_DXEmptyRow"><td colspan="11">No data to display</td></tr>')
+
+    parts.append('</table></div></body></html>')
+    return ''.join(parts)
+
+
+class MockGridHandler(BaseHTTPRequestHandler):
+    """Serves GET /grid?id=ID with keep-alive, failing a share of requests with 503 to exercise retries."""
+
+    protocol_version = 'HTTP/1.1'  # Keep connections open between requests
+    grid_rows = {}
+    fail_rate = 0.0
+    delay = 0.0
+    lock = threading.Lock()
+    requests = 0
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        with self.lock:
+            type(self).connections += 1
+
+    def do_GET(self):
+        with self.lock:
+            type(self).requests += 1
+        url = urlparse(self.path)
+        emp_id = parse_qs(url.query).get('id', [''])[-1]
+
+        if self.delay:
+            time.sleep(self.delay)
+        if url.path != '/grid':
+            self.send_page(404, 'Not found')
+        elif random.random() < self.fail_rate:
+            self.send_page(503, 'Busy')
+        else:
+            self.send_page(200, render_grid(self.grid_rows.get(emp_id, [])))
+
+    def send_page(self, status, page):
+        payload = page.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(output_file, host=DEFAULT_HOST, port=DEFAULT_PORT, fail_rate=0.0, delay=0.0):
+    """Returns a ThreadingHTTPServer serving the grids of output_file; port 0 picks a free port."""
+    handler = type('BoundMockGridHandler', (MockGridHandler,), {
+        'grid_rows': load_grid_rows(output_file), 'fail_rate': fail_rate, 'delay': delay,
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a mock wfStatusGrid endpoint from a fixture output.csv "
+                                                 "(see generate_fixtures.py) for trying harvester.py on localhost.")
+    parser.add_argument('fixture', help="'01 vac.js'-format output.csv whose blocks become the grids")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"address to bind (default: {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="share of requests answered with 503 (default: 0)")
+    parser.add_argument('--delay', type=float, default=0.0, help="seconds to wait before each answer (default: 0)")
+    args = parser.parse_args()
+
+    server = serve(args.fixture, args.host, args.port, args.fail_rate, args.delay)
+    host, port = server.server_address[:2]
+    print(f"✅ Mock grid for {len(server.RequestHandlerClass.grid_rows)} IDs on http://{host}:{port}/grid?id={{id}}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    finally:
+        server.server_close()
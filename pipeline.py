@@ -0,0 +1,101 @@
+import argparse
+import csv
+import importlib.util
+import os
+from datetime import datetime
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_stage(file_name):
+    """Imports one of the numbered stage scripts, whose file names are not valid module names."""
+    module_name = "stage_" + os.path.splitext(file_name)[0].replace(" ", "_")
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRIPT_DIR, file_name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+filter_stage = load_stage("02 filter.py")
+approved_stage = load_stage("04 approved.py")
+analyze_stage = load_stage("06 analyze.py")
+leaveadjust_stage = load_stage("07 leaveadjust.py")
+
+
+def write_through(rows, output_file, header):
+    """Yields rows unchanged while also writing them to output_file (for auditing)."""
+    with open(output_file, mode='w', newline='', encoding='utf-8') as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow(row)
+            yield row
+
+
+def count_rows(rows, counts, key):
+    """Yields rows unchanged while counting them into counts[key]."""
+    counts[key] = 0
+    for row in rows:
+        counts[key] += 1
+        yield row
+
+
+def run_pipeline(year, excel_input, excel_output, write_intermediate=False):
+    """
+    Runs filter -> approve -> analyze -> leave-adjust in one process.
+
+    output.csv and employee.csv are each parsed exactly once and rows are
+    passed between stages as generators instead of CSV files.
+
+    Args:
+        year (int): Year of the approved leaves to keep (stage 04).
+        excel_input (str): Project workbook to update (stage 07).
+        excel_output (str): Path for the updated workbook.
+        write_intermediate (bool): Also write filtered_output.csv,
+            approved_2025_output.csv and leave_analysis_report.csv.
+    """
+    counts = {}
+
+    # Roster, read once and shared by the filter and analyze stages
+    employee_codes = filter_stage.load_employee_codes('employee.csv')
+    print(f"Loaded {len(employee_codes)} employee codes.")
+
+    with open('output.csv', mode='r', encoding='utf-8', errors='ignore',
+              buffering=filter_stage.READ_BUFFER_SIZE) as infile:
+        # 02: filter raw lines
+        rows = count_rows(filter_stage.filter_lines(infile, employee_codes), counts, 'filtered')
+        if write_intermediate:
+            rows = write_through(rows, 'filtered_output.csv', filter_stage.header)
+
+        # 04: keep approved leaves for the year
+        rows = count_rows(approved_stage.approved_rows(rows, year), counts, 'approved')
+        if write_intermediate:
+            rows = write_through(rows, 'approved_2025_output.csv', filter_stage.header)
+
+        # 06: store leaves as columns grouped per employee; this drains the stream
+        leave_columns = analyze_stage.collect_leave_records(rows)
+
+    print(f"✅ Matching records: {counts['filtered']}")
+    print(f"✅ Total approved records for {year}: {counts['approved']}")
+    print(f"Found leave data for {len(leave_columns)} employees.")
+
+    window = [(analyze_stage.start_check, analyze_stage.end_check)]
+    report_rows = (row[2:] for row in analyze_stage.analyze_windows(employee_codes, leave_columns, window))
+    if write_intermediate:
+        report_rows = write_through(report_rows, 'leave_analysis_report.csv', analyze_stage.report_header)
+
+    # 07: update the workbook from the in-memory report
+    df_csv = leaveadjust_stage.report_frame(report_rows)
+    leaveadjust_stage.update_excel_with_leave_data(excel_input, None, excel_output, df_csv=df_csv)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run stages 02, 04, 06 and 07 in one process without intermediate files.")
+    parser.add_argument('--year', type=int, default=datetime.now().year,
+                        help="year of approved leaves to keep (default: current year)")
+    parser.add_argument('--write-intermediate', action='store_true',
+                        help="also write filtered_output.csv, approved_2025_output.csv and leave_analysis_report.csv")
+    args = parser.parse_args()
+
+    run_pipeline(args.year, 'AL HARAM PROJECTS.xlsx', 'AL HARAM PROJECTS_updated.xlsx',
+                 write_intermediate=args.write_intermediate)
@@ -0,0 +1,226 @@
+import argparse
+import csv
+import os
+from collections import Counter
+
+import openpyxl
+
+from file_cache import load_cached
+from harvest_parser import parse_lines
+from roster import load_employee_codes
+
+# Bump when a scanner's result changes, so old caches are ignored
+CACHE_VERSION = 2
+
+REPORT_FILE = 'reconciliation_report.csv'
+
+# The project workbook's header is on row 2, below the 'Al Shamiyah Project' title
+WORKBOOK_HEADER_ROW = 2
+
+
+def scan_harvest(output_file):
+    """Returns {ID: leave rows} for every block of the '01 vac.js' dump, including IDs with no rows."""
+    blocks = Counter()
+    with open(output_file, mode='r', encoding='utf-8', errors='ignore') as infile:
+        for _ in parse_lines(infile, blocks):
+            pass
+    return dict(blocks)
+
+
+def scan_leave_csv(csv_file):
+    """Returns {Employee Code: rows} for a CSV in filtered_output.csv column order."""
+    counts = Counter()
+    with open(csv_file, mode='r', encoding='utf-8') as infile:
+        reader = csv.reader(infile)
+        next(reader, None)  # Skip header
+        for row in reader:
+            if len(row) > 3:
+                counts[row[3].strip()] += 1
+    return dict(counts)
+
+
+def scan_analysis(report_file):
+    """Returns {Employee Code: (rows, Status of the first row)} from leave_analysis_report.csv."""
+    counts = Counter()
+    statuses = {}
+    with open(report_file, mode='r', encoding='utf-8') as infile:
+        reader = csv.reader(infile)
+        next(reader, None)  # Skip header
+        for row in reader:
+            if len(row) > 1:
+                counts[row[0].strip()] += 1
+                statuses.setdefault(row[0].strip(), row[1].strip())
+    return {code: (count, statuses[code]) for code, count in counts.items()}
+
+
+def scan_workbook(excel_file):
+    """Returns {ID: rows} from the 'ID' column of the project workbook's first sheet."""
+    counts = Counter()
+    workbook = openpyxl.load_workbook(excel_file, read_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(min_row=WORKBOOK_HEADER_ROW, values_only=True)
+        header = [str(cell).strip() if cell is not None else '' for cell in next(rows, ())]
+        id_column = header.index('ID')
+        for row in rows:
+            value = row[id_column] if id_column < len(row) else None
+            if isinstance(value, float) and value.is_integer():
+                value = int(value)  # 640968.0 -> 640968
+            if value is not None and str(value).strip():
+                counts[str(value).strip()] += 1
+    finally:
+        workbook.close()
+    return dict(counts)
+
+
+# (stage, default file, scanner) in pipeline order
+STAGES = [
+    ('harvest', 'output.csv', scan_harvest),
+    ('filtered', 'filtered_output.csv', scan_leave_csv),
+    ('approved', 'approved_2025_output.csv', scan_leave_csv),
+    ('analyzed', 'leave_analysis_report.csv', scan_analysis),
+    ('workbook', 'AL HARAM PROJECTS.xlsx', scan_workbook),
+]
+STAGE_SCANNERS = {stage: scanner for stage, _, scanner in STAGES}
+DEFAULT_STAGE_FILES = {stage: path for stage, path, _ in STAGES}
+
+
+def stage_data(stage, path=None):
+    """
+    Returns the scan of one stage's file, or None if the file does not exist.
+
+    Each scan is cached next to the file (e.g. filtered_output.csv.reconcile)
+    and reused until the file changes, so repeated audits only stat the files.
+    """
+    path = path or DEFAULT_STAGE_FILES[stage]
+    if not os.path.exists(path):
+        return None
+    return load_cached(path, f"{path}.reconcile", STAGE_SCANNERS[stage], CACHE_VERSION)
+
+
+def stage_employees(stage, path=None):
+    """Returns the set of employee codes present in one stage, or None if its file does not exist."""
+    data = stage_data(stage, path)
+    if data is None:
+        return None
+    return set(data)
+
+
+def report_header(stages):
+    """Returns the reconciliation report header for the stages reconcile() found."""
+    header = ['Employee Code', 'In Roster']
+    for stage in stages:
+        header.append(stage.title())
+        if stage == 'analyzed':
+            header.append('Analysis Status')
+    return header + ['First Missing Stage']
+
+
+def reconcile(employee_codes, stage_files=None):
+    """
+    Tracks every employee through the stages.
+
+    Args:
+        employee_codes (set): The roster.
+        stage_files (dict, optional): Stage -> file, overriding DEFAULT_STAGE_FILES.
+
+    Returns:
+        tuple: (stages whose file exists, report rows). There is one row per
+        employee in the roster or in any stage, sorted by code, with the
+        columns of report_header(stages): Employee Code, In Roster, one column
+        per stage, First Missing Stage. A stage column holds the employee's row
+        count or '' if absent; a harvest count of 0 means the ID was harvested
+        but had no leave rows. The 'analyzed' column is followed by Analysis
+        Status, the status of the employee's first report row ("no leave"
+        still counts as analyzed). First Missing Stage is the first of
+        harvest/filtered/approved/analyzed the employee is absent from, for
+        roster employees.
+    """
+    stage_files = {**DEFAULT_STAGE_FILES, **(stage_files or {})}
+    scans = {stage: stage_data(stage, stage_files[stage]) for stage, _, _ in STAGES}
+    stages = [stage for stage, _, _ in STAGES if scans[stage] is not None]
+
+    all_codes = set(employee_codes)
+    for stage in stages:
+        all_codes.update(scans[stage])
+
+    rows = []
+    for code in sorted(all_codes):
+        in_roster = code in employee_codes
+        cells = []
+        for stage in stages:
+            if stage == 'analyzed':
+                cells.extend(scans[stage].get(code, ('', '')))
+            else:
+                cells.append(scans[stage].get(code, ''))
+
+        first_missing = ''
+        if in_roster:
+            for stage in stages:
+                if stage != 'workbook' and code not in scans[stage]:
+                    first_missing = stage
+                    break
+
+        rows.append([code, 'Yes' if in_roster else 'No'] + cells + [first_missing])
+
+    return stages, rows
+
+
+def print_missing(stage, employee_codes, path=None):
+    """Prints the roster employees missing from one stage's file, as 03/05 checkmissing do."""
+    path = path or DEFAULT_STAGE_FILES[stage]
+    present = stage_employees(stage, path)
+
+    if present is None:
+        print(f"\n❌ File '{path}' does not exist.")
+        return
+
+    present_in_output = present & employee_codes
+    missing_employees = employee_codes - present_in_output
+
+    print(f"\n✅ Records found for {len(present_in_output)} employees in {path}.")
+    print(f"❌ Missing employees: {len(missing_employees)}")
+
+    if missing_employees:
+        print(f"\n🚫 These employee codes are missing in {path}:")
+        for code in sorted(missing_employees):
+            print(code)
+    else:
+        print(f"\n🎉 All employees from employee.csv are present in {path}!")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report, per employee, which pipeline stages they appear in and where they drop out.")
+    for stage, path, _ in STAGES:
+        parser.add_argument(f"--{stage}", metavar='FILE', default=path, help=f"{stage} stage file (default: {path})")
+    parser.add_argument('--output', default=REPORT_FILE, help=f"report file (default: {REPORT_FILE})")
+    args = parser.parse_args()
+
+    employee_codes = load_employee_codes('employee.csv')
+    print(f"Total employee codes in employee.csv: {len(employee_codes)}")
+
+    stages, rows = reconcile(employee_codes, {stage: getattr(args, stage) for stage, _, _ in STAGES})
+    for stage, _, _ in STAGES:
+        if stage not in stages:
+            print(f"⚠️ Skipping '{stage}': file '{getattr(args, stage)}' does not exist.")
+
+    with open(args.output, mode='w', newline='', encoding='utf-8') as report_file:
+        writer = csv.writer(report_file)
+        header = report_header(stages)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+    print("\n📊 Roster employees present per stage:")
+    for stage in stages:
+        column = header.index(stage.title())
+        present = sum(1 for row in rows if row[1] == 'Yes' and row[column] != '')
+        extra = sum(1 for row in rows if row[1] == 'No' and row[column] != '')
+        print(f"- {stage}: {present} of {len(employee_codes)}" + (f" (+{extra} not in the roster)" if extra else ""))
+
+    dropped = Counter(row[-1] for row in rows if row[-1])
+    if dropped:
+        print("\n🚫 Roster employees by first stage they are missing from:")
+        for stage in stages:
+            if dropped[stage]:
+                print(f"- {stage}: {dropped[stage]}")
+
+    print(f"\n✅ Reconciliation report saved to '{args.output}'")
@@ -0,0 +1,40 @@
+import csv
+
+from file_cache import load_cached
+
+EMPLOYEE_FILE = 'employee.csv'
+
+# Bump when the parsing rule or cache layout changes, so old caches are ignored
+CACHE_VERSION = 1
+
+
+def cache_path_for(employee_file):
+    """Returns the cache file kept next to the roster CSV."""
+    return f"{employee_file}.cache"
+
+
+def parse_employee_codes(employee_file):
+    """Reads employee codes (third column) from employee.csv into a set."""
+    employee_codes = set()
+
+    with open(employee_file, mode='r', encoding='utf-8') as emp_file:
+        reader = csv.reader(emp_file)
+        for row in reader:
+            if len(row) >= 3:
+                code = row[2].strip().strip('"')  # Third column is Employee Code
+                if code.isdigit() or code.startswith(("60", "12")):
+                    employee_codes.add(code)
+
+    return employee_codes
+
+
+def load_employee_codes(employee_file=EMPLOYEE_FILE):
+    """
+    Returns the roster's employee codes as a set, using a binary cache.
+
+    The cache is keyed by the CSV's absolute path, size and modification time,
+    so it is rebuilt automatically whenever employee.csv changes. If the cache
+    cannot be read or written, the CSV is simply parsed.
+    """
+    return set(load_cached(employee_file, cache_path_for(employee_file),
+                           lambda path: sorted(parse_employee_codes(path)), CACHE_VERSION))
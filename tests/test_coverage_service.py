@@ -0,0 +1,158 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import coverage_service
+
+APPROVED_HEADER = ['PID', 'Submission Date', 'Workflow Type', 'Employee Code', 'Employee_Name',
+                   'Start Date', 'End Date', 'Period', 'Sent To Payroll', 'Status']
+
+
+def leave_row(pid, employee_code, start, end):
+    return [pid, '01/05/2025', 'Annual Leave', employee_code, 'Name', start, end, '1', 'No', 'Approved']
+
+
+class CoverageServiceTest(unittest.TestCase):
+    """Queries coverage_service.py on a free localhost port, for the default 14-20 June 2025 week."""
+
+    def setUp(self):
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        self.employee_file = os.path.join(work_dir.name, 'employee.csv')
+        self.approved_file = os.path.join(work_dir.name, 'approved_2025_output.csv')
+
+        with open(self.employee_file, mode='w', newline='', encoding='utf-8') as emp_file:
+            writer = csv.writer(emp_file)
+            writer.writerow(['No', 'Name', 'Employee Code'])
+            for number, code in enumerate(['60001', '60002', '60003'], start=1):
+                writer.writerow([number, 'Name', code])
+
+        self.write_approved([
+            leave_row('1001', '60001', '10/06/2025', '25/06/2025'),  # Whole week
+            leave_row('1002', '60002', '15/06/2025', '16/06/2025'),  # Part of the week
+            leave_row('1003', '60002', '19/06/2025', '19/06/2025'),
+            leave_row('1004', '70000', '14/06/2025', '20/06/2025'),  # Not in the roster
+        ])
+
+        # Keep the reload messages of the server thread out of the test output
+        stdout = mock.patch('sys.stdout', new_callable=io.StringIO)
+        stdout.start()
+        self.addCleanup(stdout.stop)
+
+        self.server = coverage_service.serve(self.employee_file, self.approved_file, port=0)
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            self.server.shutdown()
+            self.server.server_close()
+            thread.join()
+
+        self.addCleanup(stop)
+        host, port = self.server.server_address[:2]
+        self.base_url = f"http://{host}:{port}"
+
+    def write_approved(self, rows):
+        with open(self.approved_file, mode='w', newline='', encoding='utf-8') as approved_file:
+            writer = csv.writer(approved_file)
+            writer.writerow(APPROVED_HEADER)
+            writer.writerows(rows)
+
+    def get(self, path):
+        """Returns (status, JSON body) of a GET request."""
+        try:
+            with urlopen(self.base_url + path, timeout=10) as response:
+                return response.status, json.loads(response.read())
+        except HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_coverage_of_one_employee(self):
+        status, body = self.get('/coverage?employee=60001')
+        self.assertEqual(status, 200)
+        self.assertEqual(body['status'], 'fully covered')
+        self.assertTrue(body['in_roster'])
+        self.assertEqual(body['leaves'], [{'pid': '1001', 'start': '10/06/2025', 'end': '25/06/2025'}])
+
+        _, body = self.get('/coverage?employee=60002')
+        self.assertEqual(body['status'], 'partially covered')
+        self.assertEqual([leave['pid'] for leave in body['leaves']], ['1002', '1003'])
+
+        _, body = self.get('/coverage?employee=70000')
+        self.assertEqual(body['status'], 'fully covered')
+        self.assertFalse(body['in_roster'])
+
+    def test_coverage_of_other_window(self):
+        _, body = self.get('/coverage?employee=60002&start=15/06/2025&end=16/06/2025')
+        self.assertEqual(body['status'], 'fully covered')
+
+        _, body = self.get('/coverage?employee=60001&start=01/07/2025&end=07/07/2025')
+        self.assertEqual(body['status'], 'no leave')
+        self.assertEqual(body['leaves'], [])
+
+    def test_coverage_summary(self):
+        status, body = self.get('/coverage')
+        self.assertEqual(status, 200)
+        self.assertEqual(body['summary'], {'no leave': 1, 'fully covered': 1, 'partially covered': 1})
+
+    def test_uncovered(self):
+        status, body = self.get('/uncovered?employee=60002')
+        self.assertEqual(status, 200)
+        self.assertEqual(body['segments'], [
+            {'start': '14/06/2025', 'end': '14/06/2025'},
+            {'start': '17/06/2025', 'end': '18/06/2025'},
+            {'start': '20/06/2025', 'end': '20/06/2025'},
+        ])
+
+    def test_missing(self):
+        status, body = self.get('/missing')
+        self.assertEqual(status, 200)
+        self.assertEqual(body, {'count': 1, 'employees': ['60003'], 'elapsed_ms': body['elapsed_ms']})
+
+    def test_status(self):
+        status, body = self.get('/status')
+        self.assertEqual(status, 200)
+        self.assertEqual(body['employees'], 3)
+        self.assertEqual(body['approved_leaves'], 4)
+        self.assertEqual(body['approved_file'], self.approved_file)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.get('/coverage?employee=60001&start=2025-06-14')[0], 400)
+        self.assertEqual(self.get('/coverage?employee=60001&start=20/06/2025&end=14/06/2025')[0], 400)
+        self.assertEqual(self.get('/uncovered')[0], 400)
+        self.assertEqual(self.get('/nothing')[0], 404)
+
+    def test_reloads_changed_approved_file(self):
+        self.assertEqual(self.get('/coverage?employee=60003')[1]['status'], 'no leave')
+
+        self.write_approved([
+            leave_row('1001', '60001', '10/06/2025', '25/06/2025'),
+            leave_row('2001', '60003', '14/06/2025', '20/06/2025'),
+        ])
+        # Make sure the modification time moves even on coarse-grained file systems
+        stat = os.stat(self.approved_file)
+        os.utime(self.approved_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        self.assertEqual(self.get('/coverage?employee=60003')[1]['status'], 'fully covered')
+        self.assertEqual(self.get('/coverage?employee=60002')[1]['status'], 'no leave')
+        self.assertEqual(self.get('/missing')[1]['employees'], ['60002'])
+        self.assertEqual(self.get('/status')[1]['approved_leaves'], 2)
+
+    def test_keeps_last_good_data_when_reload_fails(self):
+        with open(self.approved_file, mode='a', encoding='utf-8') as approved_file:
+            approved_file.write('"' + 'x' * (csv.field_size_limit() + 1) + '"\n')  # Raises csv.Error on reload
+
+        status, body = self.get('/status')
+        self.assertEqual(status, 200)
+        self.assertEqual(body['approved_leaves'], 4)
+        self.assertEqual(self.get('/coverage?employee=60001')[1]['status'], 'fully covered')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import unittest
+from collections import Counter
+from unittest import mock
+
+import harvester
+import mock_wfstatus
+from generate_fixtures import generate
+from harvest_parser import parse_lines
+
+
+class HarvesterTest(unittest.TestCase):
+    """Harvests a generated fixture back from mock_wfstatus.py on localhost."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.fixture_dir = tempfile.TemporaryDirectory()
+        generate(cls.fixture_dir.name, employees=40, leaves_per_employee=4, year=2025, projects=2, seed=7)
+        cls.fixture = os.path.join(cls.fixture_dir.name, 'output.csv')
+        cls.grid_rows = mock_wfstatus.load_grid_rows(cls.fixture)
+        cls.ids = list(cls.grid_rows)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.fixture_dir.cleanup()
+
+    def setUp(self):
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        self.output = os.path.join(work_dir.name, 'output.csv')
+
+        # Retry quickly; the mock answers at once
+        patcher = mock.patch.object(harvester, 'BACKOFF_BASE', 0.001)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def start_server(self, fail_rate=0.0):
+        """Serves the fixture on a free port in a background thread. Returns (server, URL template)."""
+        server = mock_wfstatus.serve(self.fixture, port=0, fail_rate=fail_rate)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+        self.addCleanup(stop)
+        host, port = server.server_address[:2]
+        return server, f"http://{host}:{port}/grid?id={{id}}"
+
+    def harvest(self, ids, url, **kwargs):
+        """Runs harvester.harvest quietly. Returns (harvested, failed)."""
+        with contextlib.redirect_stdout(io.StringIO()):
+            return asyncio.run(harvester.harvest(ids, url, self.output, concurrency=4, **kwargs))
+
+    def read_output(self):
+        """Returns (sorted (block ID, record) pairs, Counter of block IDs) of the harvested file."""
+        blocks = Counter()
+        with open(self.output, mode='r', encoding='utf-8') as infile:
+            records = sorted(parse_lines(infile, blocks))
+        return records, blocks
+
+    def expected_records(self):
+        return sorted((block_id, record) for block_id, records in self.grid_rows.items() for record in records)
+
+    def test_harvest_matches_fixture(self):
+        _, url = self.start_server()
+        harvested, failed = self.harvest(self.ids, url)
+
+        self.assertEqual(failed, {})
+        self.assertCountEqual(harvested, self.ids)
+        records, blocks = self.read_output()
+        self.assertEqual(records, self.expected_records())
+        self.assertEqual(set(blocks), set(self.ids))
+
+    def test_resume_from_checkpoint(self):
+        _, url = self.start_server()
+        half = len(self.ids) // 2
+        self.harvest(self.ids[:half], url)
+
+        harvested, failed = self.harvest(self.ids, url)
+
+        self.assertEqual(failed, {})
+        self.assertCountEqual(harvested, self.ids[half:])  # The first half is not fetched again
+        records, _ = self.read_output()
+        self.assertEqual(records, self.expected_records())
+        with open(self.output, mode='r', encoding='utf-8') as infile:
+            processed = [line.rsplit(':', 1)[1].strip() for line in infile if line.startswith('Processing ID #')]
+        self.assertCountEqual(processed, self.ids)  # Every block written exactly once
+
+    def test_stale_output_without_checkpoint_is_overwritten(self):
+        _, url = self.start_server()
+        with open(self.output, mode='w', encoding='utf-8') as stale:
+            stale.write("Processing ID #1: 999999\n\n--- Annual Leave Data for ID: 999999 ---\n"
+                        'PID\n"1","x","Annual Leave","999999","y","1/1/2025","1/1/2025","1","No","Approved"\n')
+
+        self.harvest(self.ids, url)
+
+        records, blocks = self.read_output()
+        self.assertNotIn('999999', blocks)
+        self.assertEqual(records, self.expected_records())
+
+    def test_retries_failed_requests(self):
+        server, url = self.start_server(fail_rate=0.3)
+        harvested, failed = self.harvest(self.ids, url, max_retries=20)
+
+        self.assertEqual(failed, {})
+        self.assertCountEqual(harvested, self.ids)
+        self.assertGreater(server.RequestHandlerClass.requests, len(self.ids))
+        records, _ = self.read_output()
+        self.assertEqual(records, self.expected_records())
+
+    def test_gives_up_after_max_retries(self):
+        server, url = self.start_server(fail_rate=1.0)
+        ids = self.ids[:3]
+        harvested, failed = self.harvest(ids, url, max_retries=2)
+
+        self.assertEqual(harvested, [])
+        self.assertCountEqual(failed, ids)
+        self.assertEqual(server.RequestHandlerClass.requests, len(ids) * 3)
+        with open(self.output, mode='r', encoding='utf-8') as infile:
+            self.assertNotIn("Automation complete", infile.read())  # Not marked complete
+
+    def test_rejects_grid_of_another_id(self):
+        emp_id = next(block_id for block_id, records in self.grid_rows.items() if records)
+        page = mock_wfstatus.render_grid(self.grid_rows[emp_id])
+
+        self.assertIn('"Annual Leave"', harvester.annual_leave_csv(page, emp_id))
+        with self.assertRaises(harvester.HarvestError) as raised:
+            harvester.annual_leave_csv(page, emp_id + '0')
+        self.assertTrue(raised.exception.retry)
+
+    def test_rejects_page_without_grid(self):
+        with self.assertRaises(harvester.HarvestError):
+            harvester.annual_leave_csv('<html><body>Session expired</body></html>', '60000')
+
+
+if __name__ == '__main__':
+    unittest.main()